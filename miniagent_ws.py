@@ -2,20 +2,32 @@
 MiniAgent WebSocket client for sending support requests to Flutter app.
 Handles hello handshake, reconnection with backoff, and buffered sends.
 """
-import asyncio
 import json
 import logging
 import os
+import queue
 import time
-import uuid
 import signal
 import sys
-from datetime import datetime, timezone
+from collections import deque
 from typing import Optional, Dict, Any, Set, Tuple
 import threading
 import websocket
 from websocket import WebSocketApp
 
+# Optional: orjson is a faster drop-in for the JSON frames when installed.
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so decode error handling is unchanged.
+try:
+    import orjson
+
+    def _json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+
+    _json_loads = orjson.loads
+except ImportError:
+    _json_dumps = json.dumps
+    _json_loads = json.loads
+
 logger = logging.getLogger("miniagent")
 logger.setLevel(logging.INFO)
 if not logger.handlers:
@@ -24,21 +36,59 @@ if not logger.handlers:
     logger.addHandler(handler)
 
 
+# (epoch second, formatted "YYYY-MM-DDTHH:MM:SS") reused while the second hasn't changed
+_ts_prefix_cache = (-1, "")
+
+
+def _utc_timestamp() -> str:
+    """ISO-8601 UTC timestamp with millisecond precision, without building a datetime."""
+    global _ts_prefix_cache
+    secs, nanos = divmod(time.time_ns(), 1_000_000_000)
+    cached_secs, prefix = _ts_prefix_cache
+    if cached_secs != secs:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(secs))
+        _ts_prefix_cache = (secs, prefix)
+    return f"{prefix}.{nanos // 1_000_000:03d}+00:00"
+
+
 class MiniAgentWSClient:
     """WebSocket client with auto-reconnect and buffering."""
     
+    # Upper bound on messages buffered while disconnected; oldest are dropped first
+    max_pending_messages = 64
+    
     def __init__(self, ws_url: str, token: str, client_name: str = "python-cdp-monitor"):
         self.ws_url = ws_url
         self.token = token
         self.client_name = client_name
         self.version = "1.0"
+        # Hello fields never change for this client, so serialize the frame once for every reconnect
+        self.hello_frame = _json_dumps({
+            "type": "hello",
+            "token": self.token,
+            "client": self.client_name,
+            "version": self.version
+        })
         
         self.ws: Optional[WebSocketApp] = None
         self.connected = False
         self.authenticated = False
-        self.pending_messages = []
+        self.pending_messages = deque()
         self.lock = threading.Lock()
+        self.drained = threading.Condition(self.lock)
         self.ws_thread: Optional[threading.Thread] = None
+        # Support requests are handed to a sender thread so callers never block on the socket
+        self.outbox: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        # Support requests queued but not yet handed off by the sender; guarded by self.lock
+        self.outbox_in_flight = 0
+        self.sender_thread = threading.Thread(target=self._run_sender, daemon=True)
+        self.sender_thread.start()
+        # Set by close(); wakes the reconnect loop out of its backoff wait
+        self.closing = threading.Event()
+        
+        # Keepalive (handled by websocket-client's own ping loop)
+        self.ping_interval = 25
+        self.ping_timeout = 10
         
         # Backoff state
         self.reconnect_delay = 0.5
@@ -57,15 +107,16 @@ class MiniAgentWSClient:
         self.ws_thread.start()
     
     def _run_ws(self):
-        """Run WebSocket connection with auto-reconnect."""
-        while True:
+        """Run WebSocket connection with auto-reconnect until close() is called."""
+        while not self.closing.is_set():
             try:
                 now = time.time()
                 if now - self.last_connect_attempt < self.reconnect_delay:
-                    time.sleep(self.reconnect_delay - (now - self.last_connect_attempt))
+                    if self.closing.wait(self.reconnect_delay - (now - self.last_connect_attempt)):
+                        break
                 
                 self.last_connect_attempt = time.time()
-                logger.debug(f"Connecting to {self.ws_url}...")
+                logger.debug("Connecting to %s...", self.ws_url)
                 
                 self.ws = WebSocketApp(
                     self.ws_url,
@@ -75,13 +126,16 @@ class MiniAgentWSClient:
                     on_close=self._on_close
                 )
                 
-                self.ws.run_forever()
+                # Built-in ping keeps idle connections alive and detects dead peers,
+                # so a silently dropped socket ends run_forever and we reconnect
+                self.ws.run_forever(ping_interval=self.ping_interval, ping_timeout=self.ping_timeout)
                 
             except Exception as e:
                 logger.error(f"WebSocket error: {e}")
             
             # Backoff before reconnecting
-            time.sleep(self.reconnect_delay)
+            if self.closing.wait(self.reconnect_delay):
+                break
             self.reconnect_delay = min(self.reconnect_delay * 2, self.max_reconnect_delay)
     
     def _on_open(self, ws):
@@ -90,15 +144,8 @@ class MiniAgentWSClient:
         logger.debug("Sending hello handshake...")
         self.connected = True
         
-        hello_msg = {
-            "type": "hello",
-            "token": self.token,
-            "client": self.client_name,
-            "version": self.version
-        }
-        
         try:
-            ws.send(json.dumps(hello_msg))
+            ws.send(self.hello_frame)
             logger.info("Hello message sent successfully")
         except Exception as e:
             logger.error(f"Failed to send hello: {e}")
@@ -107,7 +154,7 @@ class MiniAgentWSClient:
     def _on_message(self, ws, message):
         """Handle incoming WebSocket messages."""
         try:
-            data = json.loads(message)
+            data = _json_loads(message)
             msg_type = data.get("type")
             
             if msg_type == "hello_ack":
@@ -137,9 +184,10 @@ class MiniAgentWSClient:
                 logger.debug("Received pong")
             
             else:
-                logger.debug(f"Received message type: {msg_type}")
+                logger.debug("Received message type: %s", msg_type)
                 if "payload" in data:
-                    logger.debug(f"Payload: {data['payload']}")
+                    # Lazy args: the payload is only repr'd when debug logging is on
+                    logger.debug("Payload: %s", data["payload"])
         
         except json.JSONDecodeError as e:
             logger.error(f"Failed to decode message: {e} | Raw message: {message[:100]}...")
@@ -162,19 +210,53 @@ class MiniAgentWSClient:
             if not self.authenticated or not self.ws:
                 return
             
+            # Frames were serialized when buffered, so a backlog flushes as a tight send loop
             while self.pending_messages:
-                msg = self.pending_messages.pop(0)
+                msg_type, frame = self.pending_messages.popleft()
                 try:
-                    self.ws.send(json.dumps(msg))
-                    logger.debug(f"Sent pending message: {msg.get('type')}")
+                    self.ws.send(frame)
+                    logger.debug("Sent pending message: %s", msg_type)
                 except Exception as e:
                     logger.error(f"Failed to send pending message: {e}")
-                    self.pending_messages.insert(0, msg)
+                    self.pending_messages.appendleft((msg_type, frame))
                     break
+            
+            if not self.pending_messages:
+                self.drained.notify_all()
+    
+    def _buffer_message(self, msg_type: str, frame: str):
+        """Buffer a serialized frame for later delivery, dropping the oldest when full.
+        Caller must hold self.lock.
+        """
+        if len(self.pending_messages) >= self.max_pending_messages:
+            dropped_type, _ = self.pending_messages.popleft()
+            logger.warning(f"Pending buffer full ({self.max_pending_messages}), dropping oldest {dropped_type}")
+        self.pending_messages.append((msg_type, frame))
+    
+    def _run_sender(self):
+        """Deliver queued support requests in order, off the caller's thread."""
+        while True:
+            msg = self.outbox.get()
+            try:
+                self._deliver_support_request(msg)
+            except Exception as e:
+                logger.error(f"Failed to deliver support request: {e}")
+            finally:
+                with self.drained:
+                    self.outbox_in_flight -= 1
+                    self.drained.notify_all()
+    
+    def _wait_for_outbox(self, timeout: float) -> bool:
+        """Wait up to timeout seconds for queued support requests to be handed off."""
+        with self.drained:
+            return self.drained.wait_for(lambda: self.outbox_in_flight == 0, timeout)
     
     def send_support_request(self, payload: Dict[str, Any]):
         """
-        Send a support request to the Flutter server.
+        Queue a support request for the Flutter server and return immediately.
+        
+        The sender thread sends it (or buffers it until authenticated) afterwards;
+        use drain() to wait for delivery.
         
         Args:
             payload: Dict with 'description', 'controlTarget', 'meta'
@@ -183,18 +265,26 @@ class MiniAgentWSClient:
             "type": "support_request",
             "payload": payload
         }
-        
+        with self.lock:
+            self.outbox_in_flight += 1
+        self.outbox.put(msg)
+    
+    def _deliver_support_request(self, msg: Dict[str, Any]):
+        """Send a support request now, or buffer it until authenticated."""
+        payload = msg["payload"]
+        # Serialize once; a failed send buffers the same frame for the retry on re-auth
+        frame = _json_dumps(msg)
         with self.lock:
             if self.authenticated and self.ws:
                 try:
-                    self.ws.send(json.dumps(msg))
+                    self.ws.send(frame)
                     logger.info(f"Sent support request: {payload.get('description', 'N/A')[:80]}")
                 except Exception as e:
                     logger.error(f"Failed to send support request: {e}")
-                    self.pending_messages.append(msg)
+                    self._buffer_message(msg["type"], frame)
             else:
                 logger.info("Not authenticated yet, buffering support request")
-                self.pending_messages.append(msg)
+                self._buffer_message(msg["type"], frame)
     
     def send_support_cancelled(self, payload: Dict[str, Any]):
         """
@@ -205,10 +295,13 @@ class MiniAgentWSClient:
             "payload": payload
         }
         
+        # Don't let the cancellation overtake a support request still in the outbox
+        self._wait_for_outbox(1.0)
+        
         with self.lock:
             if self.authenticated and self.ws:
                 try:
-                    self.ws.send(json.dumps(msg))
+                    self.ws.send(_json_dumps(msg))
                     logger.info(f"Sent cancellation: {payload.get('reason', 'N/A')}")
                 except Exception as e:
                     logger.error(f"Failed to send cancellation: {e}")
@@ -216,8 +309,19 @@ class MiniAgentWSClient:
             else:
                 logger.info("Not authenticated, cannot send cancellation")
     
+    def drain(self, timeout: float) -> bool:
+        """
+        Wait up to timeout seconds for queued and buffered messages to be sent.
+        Returns immediately if nothing is pending; True if everything was sent.
+        """
+        with self.drained:
+            return self.drained.wait_for(
+                lambda: self.outbox_in_flight == 0 and not self.pending_messages, timeout
+            )
+    
     def close(self):
-        """Close the WebSocket connection."""
+        """Close the WebSocket connection and stop reconnecting."""
+        self.closing.set()
         if self.ws:
             self.ws.close()
 
@@ -234,8 +338,8 @@ class SupportRequestManager:
         self.recent_triggers: Dict[Tuple[str, str], float] = {}
         self.lock = threading.Lock()
         
-        # Generate a unique run ID for this process
-        self.run_id = str(uuid.uuid4())[:8]
+        # Generate a unique run ID for this process (8 hex chars, same shape as a uuid4 prefix)
+        self.run_id = os.urandom(4).hex()
         self.pid = os.getpid()
         
         # Track active request for cancellation
@@ -259,11 +363,14 @@ class SupportRequestManager:
             # Exit
             sys.exit(0)
             
+        signums = [signal.SIGINT, signal.SIGTERM]
+        if hasattr(signal, "SIGHUP"):
+            signums.append(signal.SIGHUP)
         try:
-            signal.signal(signal.SIGINT, handler)
-            signal.signal(signal.SIGTERM, handler)
-            if hasattr(signal, "SIGHUP"):
-                signal.signal(signal.SIGHUP, handler)
+            for signum in signums:
+                # Don't replace a handler the script (or the sitecustomize hook) already installed
+                if signal.getsignal(signum) in (signal.SIG_DFL, signal.default_int_handler):
+                    signal.signal(signum, handler)
         except ValueError:
             # Handles case where not running in main thread
             logger.warning("Could not setup signal handlers (not main thread?)")
@@ -312,6 +419,9 @@ class SupportRequestManager:
     ):
         """
         Trigger a support request with deduplication.
+        
+        The request is queued for the client's sender thread; it may not have been
+        sent yet when this returns.
         """
         page_id = page_id or "default"
         
@@ -323,14 +433,16 @@ class SupportRequestManager:
             if key in self.recent_triggers:
                 elapsed = now - self.recent_triggers[key]
                 if elapsed < self.cooldown_sec:
-                    logger.debug(f"Cooldown active ({elapsed:.1f}s < {self.cooldown_sec}s), skipping duplicate")
+                    logger.debug("Cooldown active (%.1fs < %ss), skipping duplicate", elapsed, self.cooldown_sec)
                     return
             
             self.recent_triggers[key] = now
             
-            # Clean old entries (older than 2x cooldown)
+            # Clean old entries (older than 2x cooldown) in place rather than rebuilding the dict
             cutoff = now - (self.cooldown_sec * 2)
-            self.recent_triggers = {k: v for k, v in self.recent_triggers.items() if v > cutoff}
+            stale = [k for k, v in self.recent_triggers.items() if v <= cutoff]
+            for k in stale:
+                del self.recent_triggers[k]
         
         # Build payload
         description = f"{reason}: {details}"
@@ -356,7 +468,7 @@ class SupportRequestManager:
             "runId": self.run_id,
             "pid": self.pid,
             "reason": reason,
-            "ts": datetime.now(timezone.utc).isoformat()
+            "ts": _utc_timestamp()
         }
         
         payload = {
@@ -375,7 +487,7 @@ class SupportRequestManager:
             payload["detection"] = detection
             
         # Log with targetId if present for verification
-        log_msg = f"Triggering support request: {reason}"
+        log_msg = f"Queueing support request: {reason}"
         if cdp_target_id:
             log_msg += f" (targetId: {cdp_target_id})"
         logger.info(log_msg)
@@ -397,7 +509,7 @@ class SupportRequestManager:
             payload = {
                 "runId": self.active_request_id,
                 "reason": reason,
-                "ts": datetime.now(timezone.utc).isoformat()
+                "ts": _utc_timestamp()
             }
             
             self.ws_client.send_support_cancelled(payload)
@@ -407,31 +519,39 @@ class SupportRequestManager:
 # Global singleton instances
 _ws_client: Optional[MiniAgentWSClient] = None
 _support_manager: Optional[SupportRequestManager] = None
+_support_disabled = False  # Set when no token is configured; avoids re-checking per call
+_init_lock = threading.Lock()
 
 
 def get_support_manager() -> Optional[SupportRequestManager]:
-    """Get or create the global SupportRequestManager."""
-    global _ws_client, _support_manager
+    """Get or create the global SupportRequestManager (one shared connection per process)."""
+    global _ws_client, _support_manager, _support_disabled
     
-    if _support_manager:
+    if _support_manager or _support_disabled:
         return _support_manager
     
-    # Read config from env
-    ws_url = os.environ.get("MINIAGENT_WS_URL", "ws://127.0.0.1:8777/ws")
-    token = os.environ.get("MINIAGENT_TOKEN", "")
-    client_name = os.environ.get("MINIAGENT_CLIENT", "python-cdp-monitor")
-    cooldown_sec = int(os.environ.get("MINIAGENT_COOLDOWN_SEC", "0"))
-    redact_urls = os.environ.get("MINIAGENT_REDACT_URLS", "0") == "1"
-    
-    if not token:
-        logger.warning("MINIAGENT_TOKEN not set - support requests disabled")
-        return None
-    
-    try:
-        _ws_client = MiniAgentWSClient(ws_url, token, client_name)
-        _support_manager = SupportRequestManager(_ws_client, cooldown_sec, redact_urls)
-        logger.info(f"MiniAgent initialized (runId: {_support_manager.run_id})")
-        return _support_manager
-    except Exception as e:
-        logger.error(f"Failed to initialize MiniAgent: {e}")
-        return None
+    with _init_lock:
+        # Another thread may have initialized while we waited
+        if _support_manager or _support_disabled:
+            return _support_manager
+        
+        # Read config from env
+        ws_url = os.environ.get("MINIAGENT_WS_URL", "ws://127.0.0.1:8777/ws")
+        token = os.environ.get("MINIAGENT_TOKEN", "")
+        client_name = os.environ.get("MINIAGENT_CLIENT", "python-cdp-monitor")
+        cooldown_sec = int(os.environ.get("MINIAGENT_COOLDOWN_SEC", "0"))
+        redact_urls = os.environ.get("MINIAGENT_REDACT_URLS", "0") == "1"
+        
+        if not token:
+            logger.warning("MINIAGENT_TOKEN not set - support requests disabled")
+            _support_disabled = True
+            return None
+        
+        try:
+            _ws_client = MiniAgentWSClient(ws_url, token, client_name)
+            _support_manager = SupportRequestManager(_ws_client, cooldown_sec, redact_urls)
+            logger.info(f"MiniAgent initialized (runId: {_support_manager.run_id})")
+            return _support_manager
+        except Exception as e:
+            logger.error(f"Failed to initialize MiniAgent: {e}")
+            return None
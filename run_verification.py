@@ -1,60 +1,83 @@
 import asyncio
+import functools
 import websockets
 import json
-import subprocess
 import os
 import signal
-import time
 import sys
-from threading import Thread
+
+try:
+    import uvloop  # Optional: faster event loop for the harness (not available on Windows)
+except ImportError:
+    uvloop = None
+
+# Optional: orjson for faster frame (de)serialization; replies stay text frames like the real server's
+try:
+    import orjson
+
+    def _json_dumps(obj):
+        return orjson.dumps(obj).decode("utf-8")
+
+    _json_loads = orjson.loads
+except ImportError:
+    _json_dumps = json.dumps
+    _json_loads = json.loads
 
 # Configuration
 WS_PORT = 8790
 WS_URL = f"ws://127.0.0.1:{WS_PORT}/ws"
 
+# Static replies, serialized once
+_HELLO_ACK = _json_dumps({"type": "hello_ack"})
+_SUPPORT_REQUEST_ACK = _json_dumps({
+    "type": "support_request_ack",
+    "requestId": "test-req-1",
+    "roomId": "room-1"
+})
+
 # Shared state
 received_messages = []
+seen_types = set()
 server_running = False
 
-async def echo(websocket):
+async def echo(websocket, support_request_received: asyncio.Event, client_disconnected: asyncio.Event):
     global server_running
     server_running = True
     print(f"Server: Client connected")
     try:
         async for message in websocket:
             print(f"Server received: {message}")
-            data = json.loads(message)
+            data = _json_loads(message)
             received_messages.append(data)
             
             msg_type = data.get("type")
+            seen_types.add(msg_type)
+            if msg_type == "support_request":
+                support_request_received.set()
             if msg_type == "hello":
-                await websocket.send(json.dumps({"type": "hello_ack"}))
+                await websocket.send(_HELLO_ACK)
             elif msg_type == "support_request":
-                await websocket.send(json.dumps({
-                    "type": "support_request_ack", 
-                    "requestId": "test-req-1",
-                    "roomId": "room-1"
-                }))
+                await websocket.send(_SUPPORT_REQUEST_ACK)
     except websockets.exceptions.ConnectionClosed:
         print("Server: Client disconnected")
+    finally:
+        # Every frame the client sent has been handled by now
+        client_disconnected.set()
 
-async def start_server():
+async def main_async():
+    # Created here so they belong to the harness loop
+    support_request_received = asyncio.Event()
+    client_disconnected = asyncio.Event()
+    handler = functools.partial(
+        echo, support_request_received=support_request_received, client_disconnected=client_disconnected
+    )
+    
+    # Server and subprocess share one event loop, so no server thread or startup sleep is needed
     print(f"Starting mock WS server on port {WS_PORT}...")
-    async with websockets.serve(echo, "127.0.0.1", WS_PORT) as server:
-        await asyncio.Future()  # run forever
-
-def run_mock_server_thread():
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    loop.run_until_complete(start_server())
+    async with websockets.serve(handler, "127.0.0.1", WS_PORT):
+        await run_script(support_request_received, client_disconnected)
 
-def main():
-    server_thread = Thread(target=run_mock_server_thread, daemon=True)
-    server_thread.start()
-    
-    # Wait for server to start
-    time.sleep(2)
-    
+async def run_script(support_request_received: asyncio.Event, client_disconnected: asyncio.Event):
     # Use myenv python
     python_exe = os.path.join(os.getcwd(), "myenv", "bin", "python")
     
@@ -84,95 +107,104 @@ def main():
     # If the script exits, the session is over. "Cancelled" (or "Closed") is appropriate.
     # The host app likely treats "Cancelled" as "Session Ended".
     
-    env = os.environ.copy()
-    env["MINIAGENT_WS_URL"] = WS_URL
-    env["MINIAGENT_TOKEN"] = "test-token"
-    env["MINIAGENT_ON_ERROR"] = "hold"
-    env["MINIAGENT_ENABLED"] = "1"
+    # Inherit the full environment: the child needs PYTHONPATH (for sitecustomize), PATH, DISPLAY, etc.
+    env = {
+        **os.environ,
+        "MINIAGENT_WS_URL": WS_URL,
+        "MINIAGENT_TOKEN": "test-token",
+        "MINIAGENT_ON_ERROR": "hold",
+        "MINIAGENT_ENABLED": "1",
+    }
     
     print("Starting example_playwright_script.py...")
     
-    proc = subprocess.Popen(
-        [python_exe, "example_playwright_script.py"],
+    proc = await asyncio.create_subprocess_exec(
+        python_exe, "example_playwright_script.py",
         env=env,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
         preexec_fn=os.setsid 
     )
     
-    # We wait for support request
-    start_time = time.time()
-    trigger_found = False
+    # communicate() drains both pipes as the child writes, and completes when it exits
+    output = asyncio.ensure_future(proc.communicate())
+    request_seen = asyncio.ensure_future(support_request_received.wait())
+    
+    # We wait for support request, or for the script to exit first
+    done, _ = await asyncio.wait({output, request_seen}, timeout=20, return_when=asyncio.FIRST_COMPLETED)
+    request_seen.cancel()
     
-    while time.time() - start_time < 20:
-        if proc.poll() is not None:
-            break
+    if request_seen in done and proc.returncode is None:
+        print("\nReceived support request! Sending SIGTERM in 2s...")
+        await asyncio.sleep(2)
         
-        # Check messages
-        has_req = any(m.get("type") == "support_request" for m in received_messages)
-        if has_req and not trigger_found:
-            print("\nReceived support request! Sending SIGTERM in 2s...")
-            time.sleep(2)
-            
-            # Send SIGTERM (which is handled by signal handler, which calls cleanup)
-            # OR we can let it exit naturally if we could.
-            # But here `example_playwright_script` is stuck in `hold` loop.
-            # So we MUST kill it or resume it.
-            # Let's send SIGTERM. This tests the signal handler + atexit (one of them wins, probably signal handler).
-            
-            # To test ATEXIT specifically, we need it to NOT satisfy signal handler (SIGINT/SIGTERM).
-            # We need to RESUME it, then have it crash or exit.
-            
-            # Let's try to Resume it via HTTP!
-            # We need the resume port. It logs "Resume HTTP server listening on ...".
-            # We can't easily parse stdout in real time from here without blocking threads or complicated logic.
-            # But the port defaults to 8787 or similar.
-            
-            # ALTERNATIVE: Just rely on SIGTERM for now.
-            # Wait, user asked for "Global Exit Handler" for "Accepted and working".
-            # If it's working, it's running code.
-            # If I press Ctrl+C, `_handle_signal` catches it.
-            # If code raises generic Exception (not Playwright), Python exits -> `atexit`.
-            # If code calls `sys.exit()`, `atexit`.
-            
-            # So `atexit` covers the "sys.exit()" or "unhandled exception" case.
-            
-            # I will send SIGTERM to verify signal handler behaves correctly with `atexit` registered (idempotency?).
-            # Actually, `signal.SIGTERM` calls `sys.exit(signum)`.
-            # `sys.exit` triggers `atexit`!
-            # So both will run?
-            # `_handle_signal` calls `cancel` explicitly.
-            # Then exits.
-            # Then `atexit` runs `_handle_exit`, which calls `cancel`.
-            # `cancel` clears `active_request_id` -> so second call is no-op.
-            # Safe.
-            
-            os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
-            trigger_found = True
-            break
-            
-        time.sleep(1)
+        # Send SIGTERM (which is handled by signal handler, which calls cleanup)
+        # OR we can let it exit naturally if we could.
+        # But here `example_playwright_script` is stuck in `hold` loop.
+        # So we MUST kill it or resume it.
+        # Let's send SIGTERM. This tests the signal handler + atexit (one of them wins, probably signal handler).
+        
+        # To test ATEXIT specifically, we need it to NOT satisfy signal handler (SIGINT/SIGTERM).
+        # We need to RESUME it, then have it crash or exit.
+        
+        # Let's try to Resume it via HTTP!
+        # We need the resume port. It logs "Resume HTTP server listening on ...".
+        # We can't easily parse stdout in real time from here without blocking threads or complicated logic.
+        # But the port defaults to 8787 or similar.
+        
+        # ALTERNATIVE: Just rely on SIGTERM for now.
+        # Wait, user asked for "Global Exit Handler" for "Accepted and working".
+        # If it's working, it's running code.
+        # If I press Ctrl+C, `_handle_signal` catches it.
+        # If code raises generic Exception (not Playwright), Python exits -> `atexit`.
+        # If code calls `sys.exit()`, `atexit`.
+        
+        # So `atexit` covers the "sys.exit()" or "unhandled exception" case.
         
-    proc.wait()
+        # I will send SIGTERM to verify signal handler behaves correctly with `atexit` registered (idempotency?).
+        # Actually, `signal.SIGTERM` calls `sys.exit(signum)`.
+        # `sys.exit` triggers `atexit`!
+        # So both will run?
+        # `_handle_signal` calls `cancel` explicitly.
+        # Then exits.
+        # Then `atexit` runs `_handle_exit`, which calls `cancel`.
+        # `cancel` clears `active_request_id` -> so second call is no-op.
+        # Safe.
+        
+        os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
+    
+    stdout, stderr = await output
+    
+    # The child's pipes can hit EOF before echo() has read its final support_cancelled
+    # frame; give the connection a moment to close so that frame is counted
+    try:
+        await asyncio.wait_for(client_disconnected.wait(), timeout=2)
+    except asyncio.TimeoutError:
+        pass
     
     print("\n\nMessages received:")
     for msg in received_messages:
         print(f"- {msg.get('type')}: {msg.get('payload', {}).get('reason', 'N/A')}")
         
     # Print subprocess output for debugging
-    stdout, stderr = proc.communicate()
     print("\n--- Subprocess STDOUT ---")
-    print(stdout)
+    print(stdout.decode(errors="replace"))
     print("\n--- Subprocess STDERR ---")
-    print(stderr)
+    print(stderr.decode(errors="replace"))
         
     # Verify
-    has_cancel = any(m.get("type") == "support_cancelled" for m in received_messages)
-    if has_cancel:
+    if "support_cancelled" in seen_types:
         print("\nSUCCESS: Received support_cancelled message.")
     else:
         print("\nFAILURE: Did not receive support_cancelled message.")
 
+def main():
+    loop = uvloop.new_event_loop() if uvloop else asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(main_async())
+    finally:
+        loop.close()
+
 if __name__ == "__main__":
     main()
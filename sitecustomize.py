@@ -5,22 +5,19 @@ Intercepts Playwright exceptions and sends support requests without modifying us
 """
 import os
 import sys
-import logging
 import time
-import asyncio
 import threading
-import json
-import socket
-import urllib.request
+import importlib.util
 import signal
 import atexit
-from pathlib import Path
-from typing import Optional, Any, Dict
-from http.server import HTTPServer, BaseHTTPRequestHandler
+import weakref
+from collections import deque
+from operator import attrgetter
+from typing import Optional, Any, Callable, Dict, NamedTuple
 
-# Only activate if explicitly enabled
-if os.environ.get("MINIAGENT_ENABLED", "1") != "1":
-    sys.exit(0)
+# Only activate if explicitly enabled. Never sys.exit() here: sitecustomize is imported by
+# every interpreter on this PYTHONPATH, so exiting would kill unrelated Python processes too.
+_MINIAGENT_ENABLED = os.environ.get("MINIAGENT_ENABLED", "1") == "1"
 
 # Define specific error for agent intervention
 class NeedsAgentInterventionError(Exception):
@@ -31,16 +28,46 @@ class NeedsAgentInterventionError(Exception):
 import builtins
 builtins.NeedsAgentInterventionError = NeedsAgentInterventionError
 
-logger = logging.getLogger("miniagent.hook")
-logger.setLevel(logging.INFO)
-if not logger.handlers:
-    handler = logging.StreamHandler()
-    handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(message)s'))
-    logger.addHandler(handler)
+_logger = None
+_logger_lock = threading.Lock()
+
+
+def _get_logger():
+    """Return the hook's logger, importing and configuring logging on first use.
+    
+    Most interpreters on this PYTHONPATH never log anything from the hook, and importing
+    logging is the largest part of the hook's import time.
+    """
+    global _logger
+    if _logger is None:
+        with _logger_lock:
+            if _logger is None:
+                import logging
+                hook_logger = logging.getLogger("miniagent.hook")
+                hook_logger.setLevel(logging.INFO)
+                if not hook_logger.handlers:
+                    handler = logging.StreamHandler()
+                    handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(message)s'))
+                    hook_logger.addHandler(handler)
+                _logger = hook_logger
+    return _logger
 
 # Track if we've already patched
 _patched = False
 
+# Runtime switch for the Playwright method wrappers; see set_intercept_active()
+_INTERCEPT_ACTIVE = True
+
+
+def set_intercept_active(flag: bool):
+    """Enable or disable error interception at runtime.
+    
+    While disabled, wrapped Playwright methods call straight through to the original
+    method and no support requests are sent. Launch-time patches stay in place.
+    """
+    global _INTERCEPT_ACTIVE
+    _INTERCEPT_ACTIVE = bool(flag)
+
 # Error handling mode configuration
 _MODE = os.environ.get("MINIAGENT_ON_ERROR", "report").lower()  # report|hold|swallow
 _HOLD_RAW = os.environ.get("MINIAGENT_HOLD_SECS", "").strip().lower()
@@ -53,28 +80,56 @@ _RESUME_HTTP_HOST = os.environ.get("MINIAGENT_RESUME_HTTP_HOST", "127.0.0.1")
 _RESUME_HTTP_PORT_BASE = int(os.environ.get("MINIAGENT_RESUME_HTTP_PORT", "8787"))
 _RESUME_HTTP_PORT = _RESUME_HTTP_PORT_BASE  # Will be updated to actual chosen port
 _RESUME_HTTP_TOKEN = os.environ.get("MINIAGENT_RESUME_HTTP_TOKEN", "").strip()
+# Authorization header value the resume endpoint accepts, encoded once for constant-time comparison
+_RESUME_HTTP_EXPECTED_AUTH = f"Bearer {_RESUME_HTTP_TOKEN}".encode("utf-8")
 
 # Remote debugging port configuration
 _DEBUG_PORT = int(os.environ.get("MINIAGENT_DEBUG_PORT", "9222"))
 _FORCE_DEBUG_PORT = os.environ.get("MINIAGENT_FORCE_DEBUG_PORT", "1") == "1"
 
+# Browser names that get remote debugging flags, and the names recorded in browser info
+_CHROMIUM_BROWSERS = frozenset({"chromium", "chrome", "msedge"})
+_KNOWN_BROWSERS = frozenset({"chromium", "firefox", "webkit"})
+
+# Keep background/occluded tabs rendering and start maximized
+_EXTRA_CHROMIUM_ARGS = (
+    "--disable-backgrounding-occluded-windows",
+    "--disable-renderer-backgrounding",
+    "--disable-background-timer-throttling",
+    "--start-maximized",
+)
+
+# Include the page title in support requests (costs a browser round-trip per report)
+_CAPTURE_TITLE = os.environ.get("MINIAGENT_CAPTURE_TITLE", "1") == "1"
+
 # Popup/tab prevention configuration
 _PREVENT_NEW_TABS = os.environ.get("MINIAGENT_PREVENT_NEW_TABS", "1") == "1"
 _ALLOW_NEW_TAB_REGEX = os.environ.get("MINIAGENT_ALLOW_NEW_TAB_REGEX", "").strip()
 _PREVENT_TABS_LOG = os.environ.get("MINIAGENT_PREVENT_TABS_LOG", "0") == "1"
 
-# Parse allowlist regex patterns
+# Parse allowlist regex patterns into one alternation so each popup URL costs a single search
+_ALLOW_NEW_TAB_RE: Optional["re.Pattern"] = None
+# Fallback only: per-pattern list when the patterns can't be combined into one alternation
 _ALLOW_NEW_TAB_PATTERNS = []
 if _ALLOW_NEW_TAB_REGEX:
     import re
+    _allow_sources = [pattern.strip() for pattern in _ALLOW_NEW_TAB_REGEX.split(",") if pattern.strip()]
     try:
-        _ALLOW_NEW_TAB_PATTERNS = [
-            re.compile(pattern.strip()) 
-            for pattern in _ALLOW_NEW_TAB_REGEX.split(",") 
-            if pattern.strip()
-        ]
+        _ALLOW_NEW_TAB_PATTERNS = [re.compile(src) for src in _allow_sources]
     except Exception as e:
-        logger.warning(f"Failed to parse MINIAGENT_ALLOW_NEW_TAB_REGEX: {e}")
+        _get_logger().warning(f"Failed to parse MINIAGENT_ALLOW_NEW_TAB_REGEX: {e}")
+    
+    # Joining renumbers capture groups, which changes what group references (\1, (?P=name),
+    # (?(1)...)) point at, so only combine patterns without them. Combining can also fail
+    # outright, e.g. on leading inline flags such as (?i); keep the per-pattern list then.
+    if _ALLOW_NEW_TAB_PATTERNS and not any(
+        re.search(r"\\[1-9]|\(\?P=|\(\?\(", src) for src in _allow_sources
+    ):
+        try:
+            _ALLOW_NEW_TAB_RE = re.compile("|".join(f"(?:{src})" for src in _allow_sources))
+            _ALLOW_NEW_TAB_PATTERNS = []
+        except re.error:
+            pass
 
 # JavaScript snippet to prevent new tabs/popups
 _POPUP_PREVENTION_SCRIPT = """
@@ -103,12 +158,21 @@ document.addEventListener('click', (event) => {
 }, true);
 """
 
+# Shipped to the browser for every page: drop comment lines and indentation once at import.
+# Statements stay newline-separated, so semicolon insertion is unaffected.
+_POPUP_PREVENTION_SCRIPT = "\n".join(
+    line.strip() for line in _POPUP_PREVENTION_SCRIPT.splitlines()
+    if line.strip() and not line.strip().startswith("//")
+)
+
 
 def _find_free_debug_port(base_port: int, max_attempts: int = 50) -> int:
     """
     Find a free port starting from base_port by probing base_port, base_port+1, etc.
-    Returns the first free port found, or base_port if none found (with warning).
+    Returns the first free port found, or a kernel-assigned free port if the range is exhausted.
     """
+    import socket
+    
     for offset in range(max_attempts):
         port = base_port + offset
         try:
@@ -116,15 +180,22 @@ def _find_free_debug_port(base_port: int, max_attempts: int = 50) -> int:
             with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
                 s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
                 s.bind(("127.0.0.1", port))
-                logger.debug(f"Found free debug port: {port}")
+                _get_logger().debug("Found free debug port: %s", port)
                 return port
         except OSError:
             # Port is in use, try next one
             continue
     
-    # If we exhausted all attempts, warn and fall back to base_port
-    logger.warning(f"Could not find free port in range {base_port}-{base_port + max_attempts - 1}, falling back to {base_port}")
-    return base_port
+    # Range exhausted: let the kernel pick an ephemeral port rather than reusing a busy base_port
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        _get_logger().warning(f"Could not find free port in range {base_port}-{base_port + max_attempts - 1}, using {port}")
+        return port
+    except OSError:
+        _get_logger().warning(f"Could not find free port in range {base_port}-{base_port + max_attempts - 1}, falling back to {base_port}")
+        return base_port
 
 
     return None
@@ -132,45 +203,53 @@ def _find_free_debug_port(base_port: int, max_attempts: int = 50) -> int:
 
 # === Process and PID Monitoring ===
 
+class _ProcCmdlines(dict):
+    """pid -> cmdline mapping that reads /proc/<pid>/cmdline only on first lookup."""
+
+    def get(self, pid, default=""):
+        if pid not in self:
+            try:
+                with open(f'/proc/{pid}/cmdline', 'r') as f:
+                    # Cmdline arguments are null-separated
+                    self[pid] = f.read().replace('\0', ' ').strip()
+            except (OSError, UnicodeDecodeError):
+                self[pid] = default
+        return self[pid]
+
+
 def _get_process_tree_linux():
-    """Builds a dict of ppid -> list of child pids from /proc (Linux only)."""
+    """Builds a dict of ppid -> list of child pids from /proc (Linux only).
+    Cmdlines are resolved lazily, so only processes under the queried root are read.
+    """
     tree = {}
-    cmdlines = {}
+    cmdlines = _ProcCmdlines()
     try:
         # PIDs are directories in /proc that are all digits
         pids = [pid for pid in os.listdir('/proc') if pid.isdigit()]
         for pid_str in pids:
             try:
                 pid = int(pid_str)
-                # Read ppid from /proc/pid/stat
-                with open(f'/proc/{pid}/stat', 'r') as f:
-                    stat = f.read().strip()
+                # Read ppid from /proc/pid/stat (raw bytes, no decode)
+                with open(f'/proc/{pid}/stat', 'rb') as f:
+                    stat = f.read()
                     # stat format: pid (comm) state ppid ...
                     # We skip 'comm' because it can contain spaces and parens.
                     # reliably finding the last ')' is the standard way.
-                    r_paren = stat.rfind(')')
+                    r_paren = stat.rfind(b')')
                     if r_paren == -1: continue
                     
-                    rest = stat[r_paren+1:].split()
+                    # Only state and ppid are needed; don't split the ~50 trailing fields
+                    rest = stat[r_paren+1:].split(None, 2)
                     if len(rest) > 1:
                         ppid = int(rest[1])
                         if ppid not in tree:
                             tree[ppid] = []
                         tree[ppid].append(pid)
-                
-                # Read cmdline from /proc/pid/cmdline
-                try:
-                    with open(f'/proc/{pid}/cmdline', 'r') as f:
-                        # Cmdline arguments are null-separated
-                        cmd = f.read().replace('\0', ' ').strip()
-                        cmdlines[pid] = cmd
-                except:
-                    cmdlines[pid] = ""
                     
             except (FileNotFoundError, PermissionError, ValueError):
                 continue
     except Exception as e:
-        logger.debug(f"Error scanning /proc: {e}")
+        _get_logger().debug("Error scanning /proc: %s", e)
         
     return tree, cmdlines
 
@@ -223,7 +302,7 @@ def _get_process_tree_windows():
                 continue
                 
     except Exception as e:
-        logger.debug(f"Error checking processes via wmic: {e}")
+        _get_logger().debug("Error checking processes via wmic: %s", e)
         
     return tree, cmdlines
 
@@ -245,14 +324,14 @@ def _find_browser_pid(root_pid: int) -> Optional[int]:
     tree, cmdlines = _get_process_tree()
     
     # BFS traversal
-    queue = [root_pid]
+    queue = deque([root_pid])
     candidates = []
     
     # Safety: avoid infinite loops if cycle in tree (rare)
     visited = {root_pid}
     
     while queue:
-        current_pid = queue.pop(0)
+        current_pid = queue.popleft()
         
         # Check current process
         cmd = cmdlines.get(current_pid, "").lower()
@@ -280,6 +359,62 @@ def _find_browser_pid(root_pid: int) -> Optional[int]:
     return candidates[0][0]
 
 
+# Idle keep-alive DevTools HTTP connections (http.client.HTTPConnection), one per debug port
+_cdp_conns: Dict[int, Any] = {}
+_cdp_conns_lock = threading.Lock()
+_cdp_conns_atexit_registered = False
+
+
+def _cdp_get_json(debug_port: int, path: str) -> Any:
+    """
+    GET a DevTools HTTP endpoint over a pooled connection and decode the JSON body.
+    A stale pooled connection is dropped and retried once on a fresh socket.
+    """
+    global _cdp_conns_atexit_registered
+    # Imported here: sitecustomize loads in every interpreter, and CDP is only queried on a report
+    import http.client
+    import json
+    
+    for attempt in range(2):
+        # Take the connection out of the pool so the request runs without holding the lock;
+        # a concurrent caller for the same port just opens its own
+        with _cdp_conns_lock:
+            conn = _cdp_conns.pop(debug_port, None)
+        reused = conn is not None
+        if conn is None:
+            conn = http.client.HTTPConnection("127.0.0.1", debug_port, timeout=0.5)
+        try:
+            conn.request("GET", path)
+            body = conn.getresponse().read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            if not reused or attempt:
+                raise
+            continue
+        
+        with _cdp_conns_lock:
+            if debug_port in _cdp_conns:
+                conn.close()
+            else:
+                _cdp_conns[debug_port] = conn
+                if not _cdp_conns_atexit_registered:
+                    # Only interpreters that actually pooled a connection pay for the exit hook
+                    atexit.register(_close_all_cdp_conns)
+                    _cdp_conns_atexit_registered = True
+        return json.loads(body)
+
+
+def _close_all_cdp_conns():
+    """Close pooled DevTools HTTP connections on interpreter exit."""
+    with _cdp_conns_lock:
+        for conn in _cdp_conns.values():
+            try:
+                conn.close()
+            except Exception:
+                pass
+        _cdp_conns.clear()
+
+
 def _get_cdp_target_id(debug_port: int, page_url: str) -> Optional[str]:
     """
     Query DevTools Protocol to find target ID matching the page URL.
@@ -295,29 +430,87 @@ def _get_cdp_target_id(debug_port: int, page_url: str) -> Optional[str]:
         return None
     
     try:
-        url = f"http://127.0.0.1:{debug_port}/json/list"
-        with urllib.request.urlopen(url, timeout=0.5) as response:
-            targets = json.loads(response.read().decode())
-            
-            # Try exact match first
-            for target in targets:
-                if target.get("type") == "page" and target.get("url") == page_url:
-                    logger.debug(f"Found CDP target ID (exact match): {target.get('id')}")
-                    return target.get("id")
-            
-            # Try match ignoring trailing slash
-            norm_url = page_url.rstrip("/")
-            for target in targets:
-                target_url = target.get("url", "").rstrip("/")
-                if target.get("type") == "page" and target_url == norm_url:
-                    logger.debug(f"Found CDP target ID (normalized match): {target.get('id')}")
-                    return target.get("id")
+        targets = _cdp_get_json(debug_port, "/json/list")
+        
+        # Single pass: return an exact match immediately, remember the first
+        # match ignoring trailing slash as the fallback
+        norm_url = page_url.rstrip("/")
+        normalized_id = None
+        for target in targets:
+            if target.get("type") != "page":
+                continue
+            target_url = target.get("url", "")
+            if target_url == page_url:
+                _get_logger().debug("Found CDP target ID (exact match): %s", target.get("id"))
+                return target.get("id")
+            if normalized_id is None and target_url.rstrip("/") == norm_url:
+                normalized_id = target.get("id")
+        
+        if normalized_id is not None:
+            _get_logger().debug("Found CDP target ID (normalized match): %s", normalized_id)
+            return normalized_id
     except Exception as e:
-        logger.debug(f"Failed to resolve CDP target ID: {e}")
+        _get_logger().debug("Failed to resolve CDP target ID: %s", e)
     
     return None
 
 
+class _BrowserInfo(NamedTuple):
+    """Launch-time facts about a browser (or persistent context) recorded by the launch patches."""
+    browser: str
+    debug_port: Optional[int] = None
+    pid: Optional[int] = None
+
+
+# Browser info for pages whose launch wasn't tracked
+_DEFAULT_BROWSER_INFO = _BrowserInfo("chromium")
+
+# Browser (or persistent BrowserContext) -> launch info; entries go away with the object,
+# so a recycled id() can never map a new browser onto a closed one's info
+_browser_info: "weakref.WeakKeyDictionary[Any, _BrowserInfo]" = weakref.WeakKeyDictionary()
+
+
+def _lookup_browser_info(browser_or_context) -> Optional[_BrowserInfo]:
+    """Return the recorded launch info for a Browser or persistent BrowserContext, if any."""
+    try:
+        return _browser_info.get(browser_or_context)
+    except TypeError:
+        return None
+
+
+def _record_browser_info(browser_or_context, info: _BrowserInfo):
+    """Record launch info for a Browser or persistent BrowserContext."""
+    try:
+        _browser_info[browser_or_context] = info
+    except TypeError:
+        _get_logger().debug("Cannot track browser info for %s (not weak-referenceable)", type(browser_or_context).__name__)
+
+# Page -> CDP target ID; a page's target ID never changes for its lifetime
+_page_target_ids: "weakref.WeakKeyDictionary[Any, str]" = weakref.WeakKeyDictionary()
+
+
+def _cached_page_target_id(page_obj) -> Optional[str]:
+    """Return the previously resolved CDP target ID for a page, if any."""
+    try:
+        return _page_target_ids.get(page_obj)
+    except TypeError:
+        # Not weak-referenceable; never cached
+        return None
+
+
+def _get_page_target_id(page_obj, debug_port: int, page_url: str) -> Optional[str]:
+    """Resolve a page's CDP target ID, querying DevTools only until it is first found."""
+    target_id = _cached_page_target_id(page_obj)
+    if target_id is None:
+        target_id = _get_cdp_target_id(debug_port, page_url)
+        if target_id is not None:
+            try:
+                _page_target_ids[page_obj] = target_id
+            except TypeError:
+                pass
+    return target_id
+
+
 def _hold_deadline():
     """Compute hold deadline from MINIAGENT_HOLD_SECS env var."""
     if _HOLD_RAW in ("", "forever", "inf"):
@@ -328,12 +521,62 @@ def _hold_deadline():
         return None
 
 
+# Set by the in-process resume HTTP endpoint so holds wake immediately instead of on the next file poll
+_resume_requested = threading.Event()
+# Event loop -> asyncio.Event shared by every coroutine held on that loop
+_loop_resume_events: "weakref.WeakKeyDictionary[Any, asyncio.Event]" = weakref.WeakKeyDictionary()
+# Loops insert from their own threads while _signal_resume iterates from the HTTP server thread
+_loop_resume_events_lock = threading.Lock()
+
+
+def _loop_resume_event() -> "asyncio.Event":
+    """Return the running loop's shared resume event, creating it on first use."""
+    import asyncio
+    loop = asyncio.get_running_loop()
+    try:
+        with _loop_resume_events_lock:
+            event = _loop_resume_events.get(loop)
+            if event is None:
+                event = _loop_resume_events[loop] = asyncio.Event()
+    except TypeError:
+        # Loop type without weakref support; holds on it fall back to the 1s poll
+        event = asyncio.Event()
+    return event
+
+
+def _signal_resume():
+    """Wake sync and async holds after an HTTP resume (call from any thread)."""
+    _resume_requested.set()
+    with _loop_resume_events_lock:
+        waiters = list(_loop_resume_events.items())
+    for loop, event in waiters:
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            # Loop already closed
+            pass
+
+
+def _consume_resume_signal() -> bool:
+    """Return True (and reset the signal) if a resume was requested via HTTP or the resume file."""
+    resumed = _resume_requested.is_set()
+    _resume_requested.clear()
+    # Consuming the file is a single unlink() syscall; it only succeeds if the file exists
+    try:
+        os.unlink(_RESUME_FILE)
+        resumed = True
+    except OSError:
+        # Usually FileNotFoundError: no resume requested via the file
+        pass
+    return resumed
+
+
 def _park_until_resume(reason: str, details: str, page_obj=None):
     """
     Block the process until resume signal, timeout, or browser closed.
     Resume happens when MINIAGENT_RESUME_FILE is created or deadline is reached.
     """
-    logger.warning(f"Holding on error ({reason}) - waiting for agent. Resume file: {_RESUME_FILE}")
+    _get_logger().warning(f"Holding on error ({reason}) - waiting for agent. Resume file: {_RESUME_FILE}")
     deadline = _hold_deadline()
     
     # Get manager for cancellation
@@ -349,7 +592,7 @@ def _park_until_resume(reason: str, details: str, page_obj=None):
             global _last_active_page_ref
             if _last_active_page_ref:
                 page_obj = _last_active_page_ref()
-        except:
+        except Exception:
             pass
 
     if page_obj:
@@ -358,61 +601,40 @@ def _park_until_resume(reason: str, details: str, page_obj=None):
                 browser_or_context = page_obj.context
                 if hasattr(browser_or_context, "browser") and browser_or_context.browser:
                     browser_or_context = browser_or_context.browser
-        except:
+        except Exception:
             pass
     
-    
-    
-    while True:
+    # The browser PID can't change while we hold, so look it up once rather than every tick
+    browser_pid = None
+    if browser_or_context:
         try:
-            if _RESUME_FILE and Path(_RESUME_FILE).exists():
-                logger.info("Resume signal detected; continuing.")
-                try:
-                    Path(_RESUME_FILE).unlink(missing_ok=True)
-                except Exception:
-                    pass
-                return
+            info = _lookup_browser_info(browser_or_context)
+            if info:
+                browser_pid = info.pid
         except Exception:
             pass
+    
+    while True:
+        if _consume_resume_signal():
+            _get_logger().info("Resume signal detected; continuing.")
+            return
             
         # Check if request was cancelled (e.g. by signal or browser close callback)
         if manager and not manager.active_request_id:
-            logger.info("Support request cancelled; exiting hold.")
+            _get_logger().info("Support request cancelled; exiting hold.")
             sys.exit(1)
             
-        # Check if browser/page is closed
-        if page_obj:
+        # Check if browser is closed: the PID, if we found one, is the source of truth.
+        # Page close is handled by the monitor_page_close event, not polled here.
+        if browser_pid:
             try:
-                # If we have a PID, check it first as it's the source of truth
-                browser_pid = None
-                
-                # Try to get PID from browser info if available
-                if browser_or_context:
-                    # Resolve to browser object if context
-                    browser_ref = browser_or_context
-                    if hasattr(browser_ref, "browser") and browser_ref.browser:
-                        browser_ref = browser_ref.browser
-                    
-                    if id(browser_ref) in _browser_info:
-                         browser_pid = _browser_info[id(browser_ref)].get("pid")
-                
-                # Perform PID liveness check if we found one
-                if browser_pid:
-                    try:
-                        # os.kill(pid, 0) checks if process exists; raises OSError if not
-                        os.kill(browser_pid, 0)
-                    except OSError:
-                        logger.info(f"Browser process {browser_pid} is gone; cancelling support request.")
-                        if manager:
-                            manager.cancel_support_request("browser_closed")
-                        sys.exit(1)
-                
-                # Fallback to page.is_closed()
-                # We removed the active polling for cancellation here because monitor_page_close
-                # should handle it via event. But we can keep a passive check if needed.
-                pass
-            except Exception:
-                pass
+                # os.kill(pid, 0) checks if process exists; raises OSError if not
+                os.kill(browser_pid, 0)
+            except OSError:
+                _get_logger().info(f"Browser process {browser_pid} is gone; cancelling support request.")
+                if manager:
+                    manager.cancel_support_request("browser_closed")
+                sys.exit(1)
         
         # Check if browser is disconnected (secondary check)
         if browser_or_context:
@@ -424,7 +646,7 @@ def _park_until_resume(reason: str, details: str, page_obj=None):
                         is_connected = browser_or_context.is_connected()
                     
                     if not is_connected:
-                         logger.info("Browser disconnected during hold (no PID found); cancelling support request.")
+                         _get_logger().info("Browser disconnected during hold (no PID found); cancelling support request.")
                          if manager:
                              manager.cancel_support_request("browser_closed")
                          sys.exit(1)
@@ -442,18 +664,21 @@ def _park_until_resume(reason: str, details: str, page_obj=None):
                 pass
         
         if not did_wait:
-            time.sleep(1.0)
+            # No page to spin Playwright's loop on, so block on the HTTP signal directly
+            _resume_requested.wait(1.0)
 
 
 def _handle_signal(signum, frame):
     """Handle termination signals (Ctrl+C, etc)."""
-    logger.info(f"Signal {signum} received, cancelling support request...")
+    _get_logger().info(f"Signal {signum} received, cancelling support request...")
     
     try:
-        from miniagent_ws import get_support_manager
-        manager = get_support_manager()
-        if manager:
-            manager.cancel_support_request("signal_received")
+        # No support manager exists until Playwright was imported; don't create one just to cancel
+        if "miniagent_ws" in sys.modules:
+            from miniagent_ws import get_support_manager
+            manager = get_support_manager()
+            if manager:
+                manager.cancel_support_request("signal_received")
     except Exception:
         pass
         
@@ -461,77 +686,128 @@ def _handle_signal(signum, frame):
     sys.exit(signum)
 
 
+def _register_signal_handlers():
+    """Install _handle_signal for SIGINT/SIGTERM/SIGHUP.
+    
+    Called at interpreter start (main thread, before any user code), so handlers the
+    script installs later still take precedence.
+    """
+    try:
+        signal.signal(signal.SIGINT, _handle_signal)
+        signal.signal(signal.SIGTERM, _handle_signal)
+        # Handle SIGHUP (terminal closed)
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, _handle_signal)
+        _get_logger().debug("Registered signal handlers for cancellation")
+    except Exception as e:
+        _get_logger().warning(f"Failed to register signal handlers: {e}")
+
+
 def _handle_exit():
     """Handle interpreter exit (normal or exception)."""
     # Only cancel if we have an active request
     # This runs for normal exit, caught exceptions, etc.
     try:
+        # If miniagent_ws was never imported there is no manager and nothing to cancel;
+        # don't pay for importing it (and websocket-client) on every interpreter exit
+        if "miniagent_ws" not in sys.modules:
+            return
         from miniagent_ws import get_support_manager
         manager = get_support_manager()
         if manager and manager.active_request_id:
-            logger.info("Script exiting with active support request, cancelling...")
+            _get_logger().info("Script exiting with active support request, cancelling...")
             manager.cancel_support_request("script_exited")
-            # Give a small moment for the socket send to flush if needed
-            time.sleep(0.2)
+            # Let any buffered messages flush; returns at once if nothing is pending
+            manager.ws_client.drain(0.2)
     except Exception:
         pass
 
 
-atexit.register(_handle_exit)
+if _MINIAGENT_ENABLED:
+    atexit.register(_handle_exit)
 
 
-class _ResumeRequestHandler(BaseHTTPRequestHandler):
-    """Minimal HTTP handler for POST /resume with bearer auth.
-    Creates the resume file watched by the hold loop.
-    """
+_RESUME_HTTP_SERVER_VERSION = "MiniAgentResumeHTTP/1.0"
 
-    server_version = "MiniAgentResumeHTTP/1.0"
-    sys_version = ""
 
-    def log_message(self, format, *args):
-        try:
-            logger.info("resume-http: " + (format % args))
-        except Exception:
-            pass
+def _build_json_response(status: int, payload: Dict[str, Any]) -> bytes:
+    """Build a complete HTTP/1.0 JSON response (status line, headers, body) for the resume endpoint."""
+    import json
+    from email.utils import formatdate
+    from http.server import BaseHTTPRequestHandler
+    
+    try:
+        body = json.dumps(payload).encode("utf-8")
+    except (TypeError, ValueError):
+        body = b"{}"
+    reason = BaseHTTPRequestHandler.responses.get(status, ("",))[0]
+    head = (
+        f"HTTP/1.0 {status} {reason}\r\n"
+        f"Server: {_RESUME_HTTP_SERVER_VERSION}\r\n"
+        f"Date: {formatdate(usegmt=True)}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n"
+        "\r\n"
+    ).encode("latin-1")
+    return head + body
+
+
+def _build_resume_request_handler():
+    """Define the resume handler class. http.server is only imported once the endpoint is enabled."""
+    import hmac
+    from http.server import BaseHTTPRequestHandler
+    from pathlib import Path
+
+    class _ResumeRequestHandler(BaseHTTPRequestHandler):
+        """Minimal HTTP handler for POST /resume with bearer auth.
+        Creates the resume file watched by the hold loop.
+        """
 
-    def _send_json(self, status: int, payload: Dict[str, Any]):
-        try:
-            body = json.dumps(payload).encode("utf-8")
-        except Exception:
-            body = b"{}"
-        self.send_response(status)
-        self.send_header("Content-Type", "application/json")
-        self.send_header("Content-Length", str(len(body)))
-        self.end_headers()
-        try:
-            self.wfile.write(body)
-        except Exception:
-            pass
+        server_version = _RESUME_HTTP_SERVER_VERSION
+        sys_version = ""
 
-    def do_POST(self):  # noqa: N802 (method name by BaseHTTPRequestHandler)
-        if self.path != "/resume":
-            self._send_json(404, {"ok": False, "error": "not_found"})
-            return
+        def log_message(self, format, *args):
+            try:
+                _get_logger().info("resume-http: " + (format % args))
+            except Exception:
+                pass
 
-        token = _RESUME_HTTP_TOKEN
-        auth_header = self.headers.get("Authorization", "")
+        def _send_json(self, status: int, payload: Dict[str, Any]):
+            self.log_request(status)
+            self.close_connection = True
+            # Status line, headers and body go out in one write (send_response/end_headers take two)
+            try:
+                self.wfile.write(_build_json_response(status, payload))
+            except Exception:
+                pass
 
-        if not token or not auth_header.startswith("Bearer "):
-            self._send_json(401, {"ok": False, "error": "unauthorized"})
-            return
+        def do_POST(self):  # noqa: N802 (method name by BaseHTTPRequestHandler)
+            if self.path != "/resume":
+                self._send_json(404, {"ok": False, "error": "not_found"})
+                return
 
-        expected = f"Bearer {token}"
-        if auth_header.strip() != expected:
-            self._send_json(401, {"ok": False, "error": "unauthorized"})
-            return
+            # Header parsing already drops leading whitespace and the CRLF; only trailing blanks remain
+            auth_header = self.headers.get("Authorization", "").rstrip()
 
-        try:
-            Path(_RESUME_FILE).touch(exist_ok=True)
-            logger.info("Resume HTTP: resume signal emitted via file")
-            self._send_json(200, {"ok": True})
-        except Exception as e:
-            logger.error(f"Resume HTTP: failed to emit resume signal: {e}")
-            self._send_json(500, {"ok": False, "error": "server_error"})
+            # Constant-time compare so response timing doesn't leak how much of the token matched.
+            # The expected value includes the "Bearer " prefix, so no separate prefix check is needed.
+            if not _RESUME_HTTP_TOKEN or not hmac.compare_digest(
+                auth_header.encode("utf-8"), _RESUME_HTTP_EXPECTED_AUTH
+            ):
+                self._send_json(401, {"ok": False, "error": "unauthorized"})
+                return
+
+            try:
+                Path(_RESUME_FILE).touch(exist_ok=True)
+                _signal_resume()
+                _get_logger().info("Resume HTTP: resume signal emitted via file")
+                self._send_json(200, {"ok": True})
+            except Exception as e:
+                _get_logger().error(f"Resume HTTP: failed to emit resume signal: {e}")
+                self._send_json(500, {"ok": False, "error": "server_error"})
+
+    return _ResumeRequestHandler
 
 
 def _start_resume_http_server():
@@ -545,44 +821,123 @@ def _start_resume_http_server():
         return
 
     if not _RESUME_HTTP_TOKEN:
-        logger.error("Resume HTTP enabled but MINIAGENT_RESUME_HTTP_TOKEN is not set; not starting HTTP server")
+        _get_logger().error("Resume HTTP enabled but MINIAGENT_RESUME_HTTP_TOKEN is not set; not starting HTTP server")
         return
 
-    # Find a free port dynamically
-    chosen_port = _find_free_debug_port(_RESUME_HTTP_PORT_BASE)
-    _RESUME_HTTP_PORT = chosen_port
+    from http.server import ThreadingHTTPServer
     
-    try:
-        httpd = HTTPServer((_RESUME_HTTP_HOST, _RESUME_HTTP_PORT), _ResumeRequestHandler)
-    except Exception as e:
-        logger.warning(f"Resume HTTP: failed to bind {_RESUME_HTTP_HOST}:{_RESUME_HTTP_PORT}: {e}")
+    class _ResumeHTTPServer(ThreadingHTTPServer):
+        """One thread per request so a stalled client can't block a resume; concurrency is capped."""
+        daemon_threads = True
+        max_concurrent_requests = 8
+        
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self._request_slots = threading.BoundedSemaphore(self.max_concurrent_requests)
+        
+        def process_request(self, request, client_address):
+            if not self._request_slots.acquire(blocking=False):
+                # Over capacity: refuse without spawning another thread
+                try:
+                    request.sendall(_build_json_response(503, {"ok": False, "error": "busy"}))
+                except OSError:
+                    pass
+                self.shutdown_request(request)
+                return
+            try:
+                super().process_request(request, client_address)
+            except Exception:
+                self._request_slots.release()
+                raise
+        
+        def process_request_thread(self, request, client_address):
+            try:
+                super().process_request_thread(request, client_address)
+            finally:
+                self._request_slots.release()
+    
+    # Bind directly, moving up from the base port: no separate probe socket, and no window
+    # between probing a port and binding it for another process to take it
+    handler_cls = _build_resume_request_handler()
+    httpd = None
+    for offset in range(50):
+        try:
+            httpd = _ResumeHTTPServer((_RESUME_HTTP_HOST, _RESUME_HTTP_PORT_BASE + offset), handler_cls)
+            break
+        except OSError as e:
+            last_error = e
+    if httpd is None:
+        _get_logger().warning(f"Resume HTTP: failed to bind {_RESUME_HTTP_HOST}:{_RESUME_HTTP_PORT_BASE}-{_RESUME_HTTP_PORT_BASE + 49}: {last_error}")
         return
+    _RESUME_HTTP_PORT = httpd.server_address[1]
 
     th = threading.Thread(target=httpd.serve_forever, name="miniagent-resume-http", daemon=True)
     th.start()
-    logger.info(f"Resume HTTP server listening on http://{_RESUME_HTTP_HOST}:{_RESUME_HTTP_PORT}")
+    _get_logger().info(f"Resume HTTP server listening on http://{_RESUME_HTTP_HOST}:{_RESUME_HTTP_PORT}")
+
+
+# Page -> (url, title, monotonic time) of its last title() round-trip; reused briefly during error bursts
+_page_titles: "weakref.WeakKeyDictionary[Any, tuple]" = weakref.WeakKeyDictionary()
+_PAGE_TITLE_TTL = 1.0
+
+
+def _cached_page_title(page_obj, url: Optional[str]) -> Optional[str]:
+    """Return the page title fetched within the last _PAGE_TITLE_TTL seconds for the same URL."""
+    try:
+        entry = _page_titles.get(page_obj)
+    except TypeError:
+        return None
+    if entry and entry[0] == url and time.monotonic() - entry[2] < _PAGE_TITLE_TTL:
+        return entry[1]
+    return None
+
+
+def _remember_page_title(page_obj, url: Optional[str], title: str):
+    try:
+        _page_titles[page_obj] = (url, title, time.monotonic())
+    except TypeError:
+        pass
 
 
 def _get_page_info(page_obj) -> Dict[str, Any]:
     """Extract URL, title, and page ID from a Playwright Page object."""
-    info = {"url": None, "title": None, "page_id": None}
+    # Use object id as page identifier
+    url = getattr(page_obj, "url", None)
+    info = {"url": url, "title": None, "page_id": str(id(page_obj))}
     
-    try:
-        if hasattr(page_obj, "url"):
-            info["url"] = page_obj.url
-        if hasattr(page_obj, "title"):
+    if _CAPTURE_TITLE:
+        title = _cached_page_title(page_obj, url)
+        if title is None:
             try:
-                info["title"] = page_obj.title()
-            except:
+                title = page_obj.title()
+                _remember_page_title(page_obj, url, title)
+            except Exception:
                 pass
-        # Use object id as page identifier
-        info["page_id"] = str(id(page_obj))
-    except:
-        pass
+        info["title"] = title
     
     return info
 
 
+def _identity(obj):
+    return obj
+
+
+def _return_none(obj):
+    return None
+
+
+# Page and Locator methods wrapped to report Playwright errors
+_PAGE_METHODS = ("goto", "click", "fill", "press", "type", "select_option", "check",
+                 "uncheck", "wait_for_selector", "wait_for_load_state", "wait_for_url",
+                 "wait_for_timeout", "screenshot", "pdf")
+_LOCATOR_METHODS = ("click", "fill", "press", "type", "select_option", "check",
+                    "uncheck", "wait_for", "screenshot")
+
+# Page methods whose first argument (or 'selector' kwarg) is the target selector
+_SELECTOR_METHODS = frozenset({"click", "fill", "press", "type", "select_option", "check",
+                               "uncheck", "wait_for_selector"})
+
+
 def _extract_detection_selectors(method_name: str, obj, args: tuple, kwargs: dict) -> tuple:
     """
     Extract success/failure selectors from a Playwright method call.
@@ -610,7 +965,7 @@ def _extract_detection_selectors(method_name: str, obj, args: tuple, kwargs: dic
                 is_locator = True
             elif hasattr(obj, '_selector'):
                 is_locator = True
-        except:
+        except Exception:
             pass
         
         if is_locator:
@@ -634,20 +989,17 @@ def _extract_detection_selectors(method_name: str, obj, args: tuple, kwargs: dic
                         match = re.search(r"selector=['\"]([^'\"]+)['\"]", repr_str)
                         if match:
                             success_selector = match.group(1)
-            except:
+            except Exception:
                 pass
         else:
             # For Page methods, check if first arg or 'selector' kwarg contains a selector
-            selector_methods = ["click", "fill", "press", "type", "select_option", "check", 
-                              "uncheck", "wait_for_selector"]
-            
-            if method_name in selector_methods:
+            if method_name in _SELECTOR_METHODS:
                 # First positional arg is typically the selector
                 if args and len(args) > 0 and isinstance(args[0], str):
                     success_selector = args[0]
                 elif "selector" in kwargs and isinstance(kwargs["selector"], str):
                     success_selector = kwargs["selector"]
-    except:
+    except Exception:
         pass
     
     return success_selector, failure_selector
@@ -655,19 +1007,54 @@ def _extract_detection_selectors(method_name: str, obj, args: tuple, kwargs: dic
 
 def _is_url_allowed_for_new_tab(url: Optional[str]) -> bool:
     """Check if URL matches allowlist patterns for new tab creation."""
-    if not url or not _ALLOW_NEW_TAB_PATTERNS:
+    if not url:
         return False
     
+    # url is a str here, so search() can't raise
+    if _ALLOW_NEW_TAB_RE is not None:
+        return _ALLOW_NEW_TAB_RE.search(url) is not None
+    
     for pattern in _ALLOW_NEW_TAB_PATTERNS:
-        try:
-            if pattern.search(url):
-                return True
-        except Exception:
-            pass
+        if pattern.search(url):
+            return True
     
     return False
 
 
+# Page class -> whether it is the async Playwright API; resolved once per class
+_page_class_is_async: Dict[type, bool] = {}
+
+
+def _is_async_page(page_obj) -> bool:
+    """Return True if page_obj belongs to the async Playwright API."""
+    cls = page_obj.__class__
+    is_async = _page_class_is_async.get(cls)
+    if is_async is None:
+        import inspect
+        is_async = inspect.iscoroutinefunction(getattr(cls, 'add_init_script', None))
+        _page_class_is_async[cls] = is_async
+    return is_async
+
+
+def _close_popup_sync(popup):
+    popup.close()
+
+
+def _close_popup_async(popup):
+    # Async pages return a coroutine; schedule it properly
+    import asyncio
+    close_result = popup.close()
+    try:
+        loop = asyncio.get_event_loop()
+        if loop.is_running():
+            asyncio.create_task(close_result)
+        else:
+            loop.run_until_complete(close_result)
+    except Exception:
+        # Fallback: let it be garbage collected
+        pass
+
+
 def _install_popup_prevention_on_page(page_obj):
     """Install popup prevention on a Playwright Page object (sync or async).
     
@@ -677,8 +1064,8 @@ def _install_popup_prevention_on_page(page_obj):
     if not _PREVENT_NEW_TABS:
         return
     
-    import inspect
-    is_async = inspect.iscoroutinefunction(getattr(page_obj.__class__, 'add_init_script', None))
+    # Sync vs async is fixed per page, so pick the close strategy once rather than per popup
+    close_popup = _close_popup_async if _is_async_page(page_obj) else _close_popup_sync
     
     try:
         # Add init script to override window.open and intercept _blank links
@@ -686,49 +1073,32 @@ def _install_popup_prevention_on_page(page_obj):
             result = page_obj.add_init_script(_POPUP_PREVENTION_SCRIPT)
             # If async, we can't await here, but the script will still be added
             if _PREVENT_TABS_LOG:
-                logger.info(f"Popup prevention script installed on page {id(page_obj)}")
+                _get_logger().info(f"Popup prevention script installed on page {id(page_obj)}")
         
         # Add popup handler to close any popups that still manage to open
         if hasattr(page_obj, 'on'):
             def _popup_handler(popup):
                 try:
-                    popup_url = None
-                    try:
-                        popup_url = popup.url
-                    except:
-                        pass
+                    popup_url = getattr(popup, "url", None)
                     
                     # Check if popup URL is in allowlist
                     if popup_url and _is_url_allowed_for_new_tab(popup_url):
                         if _PREVENT_TABS_LOG:
-                            logger.info(f"Allowing popup with URL: {popup_url}")
+                            _get_logger().info(f"Allowing popup with URL: {popup_url}")
                         return
                     
-                    # Close the popup - handle both sync and async
-                    close_result = popup.close()
-                    # If it's a coroutine, schedule it properly
-                    if inspect.iscoroutine(close_result):
-                        import asyncio
-                        try:
-                            loop = asyncio.get_event_loop()
-                            if loop.is_running():
-                                asyncio.create_task(close_result)
-                            else:
-                                loop.run_until_complete(close_result)
-                        except:
-                            # Fallback: let it be garbage collected
-                            pass
+                    close_popup(popup)
                     
                     if _PREVENT_TABS_LOG:
-                        logger.info(f"Closed popup with URL: {popup_url or 'unknown'}")
+                        _get_logger().info(f"Closed popup with URL: {popup_url or 'unknown'}")
                 except Exception as e:
                     if _PREVENT_TABS_LOG:
-                        logger.warning(f"Failed to close popup: {e}")
+                        _get_logger().warning(f"Failed to close popup: {e}")
             
             page_obj.on("popup", _popup_handler)
         
     except Exception as e:
-        logger.warning(f"Failed to configure popup prevention on page: {e}")
+        _get_logger().warning(f"Failed to configure popup prevention on page: {e}")
 
 
 def _install_popup_prevention_on_context(context_obj):
@@ -744,13 +1114,13 @@ def _install_popup_prevention_on_context(context_obj):
             def _page_handler(page):
                 _install_popup_prevention_on_page(page)
                 if _PREVENT_TABS_LOG:
-                    logger.info(f"Auto-installed popup prevention on new page {id(page)}")
+                    _get_logger().info(f"Auto-installed popup prevention on new page {id(page)}")
             
             context_obj.on("page", _page_handler)
             if _PREVENT_TABS_LOG:
-                logger.info(f"Popup prevention page handler installed on context {id(context_obj)}")
+                _get_logger().info(f"Popup prevention page handler installed on context {id(context_obj)}")
     except Exception as e:
-        logger.warning(f"Failed to configure popup prevention on context: {e}")
+        _get_logger().warning(f"Failed to configure popup prevention on context: {e}")
 
 
 async def _install_popup_prevention_on_page_async(page_obj):
@@ -767,36 +1137,32 @@ async def _install_popup_prevention_on_page_async(page_obj):
         if hasattr(page_obj, 'add_init_script'):
             await page_obj.add_init_script(_POPUP_PREVENTION_SCRIPT)
             if _PREVENT_TABS_LOG:
-                logger.info(f"Popup prevention script installed on async page {id(page_obj)}")
+                _get_logger().info(f"Popup prevention script installed on async page {id(page_obj)}")
         
         # Add popup handler to close any popups that still manage to open
         if hasattr(page_obj, 'on'):
             async def _popup_handler(popup):
                 try:
-                    popup_url = None
-                    try:
-                        popup_url = popup.url
-                    except:
-                        pass
+                    popup_url = getattr(popup, "url", None)
                     
                     # Check if popup URL is in allowlist
                     if popup_url and _is_url_allowed_for_new_tab(popup_url):
                         if _PREVENT_TABS_LOG:
-                            logger.info(f"Allowing popup with URL: {popup_url}")
+                            _get_logger().info(f"Allowing popup with URL: {popup_url}")
                         return
                     
                     # Close the popup
                     await popup.close()
                     if _PREVENT_TABS_LOG:
-                        logger.info(f"Closed async popup with URL: {popup_url or 'unknown'}")
+                        _get_logger().info(f"Closed async popup with URL: {popup_url or 'unknown'}")
                 except Exception as e:
                     if _PREVENT_TABS_LOG:
-                        logger.warning(f"Failed to close async popup: {e}")
+                        _get_logger().warning(f"Failed to close async popup: {e}")
             
             page_obj.on("popup", _popup_handler)
         
     except Exception as e:
-        logger.warning(f"Failed to configure popup prevention on async page: {e}")
+        _get_logger().warning(f"Failed to configure popup prevention on async page: {e}")
 
 
 def _install_popup_prevention_on_context_async(context_obj):
@@ -815,16 +1181,16 @@ def _install_popup_prevention_on_context_async(context_obj):
                 try:
                     asyncio.create_task(_install_popup_prevention_on_page_async(page))
                     if _PREVENT_TABS_LOG:
-                        logger.info(f"Scheduled async popup prevention on new page {id(page)}")
+                        _get_logger().info(f"Scheduled async popup prevention on new page {id(page)}")
                 except Exception as e:
                     if _PREVENT_TABS_LOG:
-                        logger.warning(f"Failed to schedule async popup prevention: {e}")
+                        _get_logger().warning(f"Failed to schedule async popup prevention: {e}")
             
             context_obj.on("page", _page_handler)
             if _PREVENT_TABS_LOG:
-                logger.info(f"Popup prevention page handler installed on async context {id(context_obj)}")
+                _get_logger().info(f"Popup prevention page handler installed on async context {id(context_obj)}")
     except Exception as e:
-        logger.warning(f"Failed to configure popup prevention on async context: {e}")
+        _get_logger().warning(f"Failed to configure popup prevention on async context: {e}")
 
 
 def _intercept_playwright():
@@ -840,18 +1206,23 @@ def _intercept_playwright():
         from playwright.async_api import BrowserType as AsyncBrowserType, Page as AsyncPage
         from playwright._impl._errors import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
     except ImportError:
-        logger.debug("Playwright not installed, skipping hook")
+        _get_logger().debug("Playwright not installed, skipping hook")
         return
     
+    # Needed by the async wrappers and launch patches; Playwright has already imported both,
+    # so this is free here
+    import asyncio
+    from pathlib import Path
+    
     # Get support manager
     try:
         from miniagent_ws import get_support_manager
         manager = get_support_manager()
         if not manager:
-            logger.warning("Support manager not available")
+            _get_logger().warning("Support manager not available")
             return
     except ImportError as e:
-        logger.error(f"Failed to import miniagent_ws: {e}")
+        _get_logger().error(f"Failed to import miniagent_ws: {e}")
         return
     
     # Patch Browser context manager to catch NeedsAgentInterventionError
@@ -876,7 +1247,7 @@ def _intercept_playwright():
                 if exc_type and issubclass(exc_type, NeedsAgentInterventionError):
                     # Handle the error here before closing browsers
                     if not getattr(exc_val, "_miniagent_handled", False):
-                        logger.info(f"Caught NeedsAgentInterventionError in Playwright context: {exc_val}")
+                        _get_logger().info(f"Caught NeedsAgentInterventionError in Playwright context: {exc_val}")
                         
                         # Get context from last active page
                         ctx = _get_support_context()
@@ -902,7 +1273,7 @@ def _intercept_playwright():
                         
                         # Hold if needed (browser stays open during hold)
                         if _MODE == "hold":
-                            logger.warning(f"Holding on error - browser will stay open. Resume file: {_RESUME_FILE}")
+                            _get_logger().warning(f"Holding on error - browser will stay open. Resume file: {_RESUME_FILE}")
                             # Resolve page object if available from context
                             page_obj = None
                             if hasattr(exc_val, "page"):
@@ -920,29 +1291,18 @@ def _intercept_playwright():
                 return _orig_playwright_exit(self, exc_type, exc_val, exc_tb)
             
             PlaywrightContextManager.__exit__ = _patched_playwright_exit
-            logger.debug("Patched PlaywrightContextManager for NeedsAgentInterventionError")
+            _get_logger().debug("Patched PlaywrightContextManager for NeedsAgentInterventionError")
         except ImportError:
             # Fallback: try patching via sync_api if exposed (unlikely for _context_manager)
-            logger.debug("Could not import PlaywrightContextManager directly")
+            _get_logger().debug("Could not import PlaywrightContextManager directly")
         except Exception as e:
-            logger.debug(f"Could not patch Playwright context manager: {e}")
+            _get_logger().debug("Could not patch Playwright context manager: %s", e)
             
     except ImportError:
-        logger.debug("Could not import Browser for context manager patching")
+        _get_logger().debug("Could not import Browser for context manager patching")
         
-    # Register signal handlers
-    try:
-        signal.signal(signal.SIGINT, _handle_signal)
-        signal.signal(signal.SIGTERM, _handle_signal)
-        # Handle SIGHUP (terminal closed)
-        if hasattr(signal, "SIGHUP"):
-            signal.signal(signal.SIGHUP, _handle_signal)
-        logger.debug("Registered signal handlers for cancellation")
-    except Exception as e:
-        logger.warning(f"Failed to register signal handlers: {e}")
-    
-    # Track browser info per launch
-    _browser_info: Dict[int, Dict[str, Any]] = {}
+    # BrowserContext -> its entry in _browser_info; shared by every page opened in that context
+    _context_browser_info: "weakref.WeakKeyDictionary[Any, _BrowserInfo]" = weakref.WeakKeyDictionary()
     
     # === Chromium debug port injection ===
     
@@ -952,44 +1312,42 @@ def _intercept_playwright():
         Returns:
             tuple: (modified_args, chosen_debug_port) where chosen_debug_port is None for non-Chromium browsers
         """
-        if browser_name not in ("chromium", "chrome", "msedge"):
+        if browser_name not in _CHROMIUM_BROWSERS:
             return args, None
         
-        args = list(args) if args else []
-        
-        # Remove existing debug port args if forcing
-        if _FORCE_DEBUG_PORT:
-            args = [arg for arg in args if "--remote-debugging-port" not in str(arg)]
-            args = [arg for arg in args if "--remote-debugging-address" not in str(arg)]
+        # Single pass: drop existing debug flags if forcing, otherwise note a user-set port
+        filtered = []
+        user_port_arg = None
+        for arg in args or ():
+            arg_str = str(arg)
+            if "--remote-debugging-port" in arg_str:
+                if _FORCE_DEBUG_PORT:
+                    continue
+                if user_port_arg is None:
+                    user_port_arg = arg_str
+            elif _FORCE_DEBUG_PORT and "--remote-debugging-address" in arg_str:
+                continue
+            filtered.append(arg)
+        args = filtered
         
-        # Check if debug port already set (after potential removal)
-        has_debug = any("--remote-debugging-port" in str(arg) for arg in args)
         chosen_port = None
-        if not has_debug:
+        if user_port_arg is None:
             # Find a free port dynamically
             chosen_port = _find_free_debug_port(_DEBUG_PORT)
             args.extend([
                 "--remote-debugging-address=127.0.0.1",
                 f"--remote-debugging-port={chosen_port}"
             ])
-            logger.debug(f"Injected remote debugging flags (port {chosen_port})")
+            _get_logger().debug("Injected remote debugging flags (port %s)", chosen_port)
         else:
             # Port was already set by user, extract it
-            for arg in args:
-                if "--remote-debugging-port" in str(arg):
-                    try:
-                        chosen_port = int(str(arg).split("=")[1])
-                    except:
-                        chosen_port = _DEBUG_PORT
-                    break
+            try:
+                chosen_port = int(user_port_arg.partition("=")[2])
+            except Exception:
+                chosen_port = _DEBUG_PORT
         
         # Add flags to keep background/occluded tabs rendering and start maximized
-        args.extend([
-            "--disable-backgrounding-occluded-windows",
-            "--disable-renderer-backgrounding",
-            "--disable-background-timer-throttling",
-            "--start-maximized"
-        ])
+        args.extend(_EXTRA_CHROMIUM_ARGS)
         
         return args, chosen_port
     
@@ -999,18 +1357,36 @@ def _intercept_playwright():
             return None
         
         try:
-            port_file = Path(user_data_dir) / "DevToolsActivePort"
-            if port_file.exists():
-                lines = port_file.read_text().strip().split('\n')
-                if lines:
-                    port = int(lines[0])
-                    logger.info(f"Detected debug port: {port}")
-                    return port
+            # Raw open+read with no buffered file object: the port line fits in the first 64 bytes,
+            # and int() accepts bytes and ignores the trailing newline
+            fd = os.open(os.path.join(user_data_dir, "DevToolsActivePort"), os.O_RDONLY)
+            try:
+                line = os.read(fd, 64).split(b"\n", 1)[0]
+            finally:
+                os.close(fd)
+            if line.strip():
+                port = int(line)
+                _get_logger().info(f"Detected debug port: {port}")
+                return port
+        except FileNotFoundError:
+            pass
         except Exception as e:
-            logger.debug(f"Failed to read DevToolsActivePort: {e}")
+            _get_logger().debug("Failed to read DevToolsActivePort: %s", e)
         
         return None
     
+    def _wait_for_devtools_port(user_data_dir: Optional[Path], timeout: float = 0.5) -> Optional[int]:
+        """Poll for DevToolsActivePort with short, growing delays until it appears or timeout elapses."""
+        deadline = time.monotonic() + timeout
+        delay = 0.01
+        while True:
+            port = _read_devtools_port(user_data_dir)
+            remaining = deadline - time.monotonic()
+            if port or remaining <= 0:
+                return port
+            time.sleep(min(delay, remaining))
+            delay *= 2
+    
     # Patch sync BrowserType.launch
     _orig_sync_launch = SyncBrowserType.launch
     
@@ -1021,7 +1397,7 @@ def _intercept_playwright():
         debug_port = None
         if "args" in kwargs:
             kwargs["args"], debug_port = _inject_debug_args(kwargs["args"], browser_name)
-        elif browser_name in ("chromium", "chrome", "msedge"):
+        elif browser_name in _CHROMIUM_BROWSERS:
             kwargs["args"], debug_port = _inject_debug_args([], browser_name)
         
         browser = _orig_sync_launch(self, *args, **kwargs)
@@ -1029,28 +1405,19 @@ def _intercept_playwright():
         # Store browser info with the actual debug port used
         pid = _find_browser_pid(os.getpid())
         
-        if browser_name in ("chromium", "chrome", "msedge"):
-            _browser_info[id(browser)] = {
-                "browser": browser_name,
-                "debug_port": debug_port,
-                "pid": pid
-            }
-            logger.info(f"Chromium launched with debug port {debug_port}, PID {pid}")
+        if browser_name in _CHROMIUM_BROWSERS:
+            _record_browser_info(browser, _BrowserInfo(browser_name, debug_port, pid))
+            _get_logger().info(f"Chromium launched with debug port {debug_port}, PID {pid}")
         else:
-            _browser_info[id(browser)] = {
-                "browser": "firefox" if browser_name == "firefox" else "webkit",
-                "debug_port": None,
-                "pid": pid
-            }
+            _record_browser_info(browser, _BrowserInfo(
+                "firefox" if browser_name == "firefox" else "webkit", None, pid
+            ))
         
-        # Monitor for browser close
+        # Monitor for browser close (manager is bound once at patch time)
         try:
-            from miniagent_ws import get_support_manager
-            manager = get_support_manager()
-            if manager:
-                manager.monitor_browser_close(browser)
+            manager.monitor_browser_close(browser)
         except Exception as e:
-            logger.warning(f"Failed to attach browser monitor: {e}")
+            _get_logger().warning(f"Failed to attach browser monitor: {e}")
         
         return browser
     
@@ -1066,32 +1433,28 @@ def _intercept_playwright():
         debug_port = None
         if "args" in kwargs:
             kwargs["args"], debug_port = _inject_debug_args(kwargs["args"], browser_name)
-        elif browser_name in ("chromium", "chrome", "msedge"):
+        elif browser_name in _CHROMIUM_BROWSERS:
             kwargs["args"], debug_port = _inject_debug_args([], browser_name)
         
         context = _orig_sync_launch_persistent(self, user_data_dir, *args, **kwargs)
         
         # Set debug port for Chromium (use the port we chose)
-        if browser_name in ("chromium", "chrome", "msedge"):
-            # Sanity check: read DevToolsActivePort file if available
-            import time
-            time.sleep(0.5)  # Give Chrome time to write the file
-            detected_port = _read_devtools_port(Path(user_data_dir))
+        if browser_name in _CHROMIUM_BROWSERS:
+            # Sanity check: read DevToolsActivePort file once Chrome has written it
+            detected_port = _wait_for_devtools_port(Path(user_data_dir))
             if detected_port and detected_port != debug_port:
-                logger.warning(f"DevToolsActivePort mismatch: configured={debug_port}, detected={detected_port}")
+                _get_logger().warning(f"DevToolsActivePort mismatch: configured={debug_port}, detected={detected_port}")
                 # Use detected port if it differs (Chrome may have chosen different port)
                 debug_port = detected_port
             
-            logger.info(f"Chromium persistent context launched with debug port {debug_port}")
+            _get_logger().info(f"Chromium persistent context launched with debug port {debug_port}")
         
         # Find browser PID
         pid = _find_browser_pid(os.getpid())
         
-        _browser_info[id(context)] = {
-            "browser": browser_name if browser_name in ("chromium", "firefox", "webkit") else "chromium",
-            "debug_port": debug_port,
-            "pid": pid
-        }
+        _record_browser_info(context, _BrowserInfo(
+            browser_name if browser_name in _KNOWN_BROWSERS else "chromium", debug_port, pid
+        ))
         
         # Install popup prevention on persistent context
         _install_popup_prevention_on_context(context)
@@ -1100,19 +1463,16 @@ def _intercept_playwright():
             for page in context.pages:
                 _install_popup_prevention_on_page(page)
         except Exception as e:
-            logger.debug(f"Could not install popup prevention on persistent context pages: {e}")
+            _get_logger().debug("Could not install popup prevention on persistent context pages: %s", e)
         
         # Monitor for browser close (context)
         try:
-            from miniagent_ws import get_support_manager
-            manager = get_support_manager()
-            if manager:
-                manager.monitor_browser_close(context)
-                # Monitor existing pages too
-                for page in context.pages:
-                    manager.monitor_page_close(page)
+            manager.monitor_browser_close(context)
+            # Monitor existing pages too
+            for page in context.pages:
+                manager.monitor_page_close(page)
         except Exception as e:
-            logger.warning(f"Failed to attach context monitor: {e}")
+            _get_logger().warning(f"Failed to attach context monitor: {e}")
 
         return context
     
@@ -1124,7 +1484,7 @@ def _intercept_playwright():
     try:
         from playwright.sync_api import Browser as SyncBrowser, BrowserContext as SyncBrowserContext
     except ImportError:
-        logger.debug("Could not import sync Browser/BrowserContext for popup prevention")
+        _get_logger().debug("Could not import sync Browser/BrowserContext for popup prevention")
         SyncBrowser = None
         SyncBrowserContext = None
     
@@ -1138,17 +1498,14 @@ def _intercept_playwright():
             
             # Monitor page close
             try:
-                from miniagent_ws import get_support_manager
-                manager = get_support_manager()
-                if manager:
-                    manager.monitor_page_close(page)
+                manager.monitor_page_close(page)
             except Exception:
                 pass
                 
             return page
         
         SyncBrowserContext.new_page = _patched_sync_context_new_page
-        logger.debug("Patched sync BrowserContext.new_page for popup prevention and monitoring")
+        _get_logger().debug("Patched sync BrowserContext.new_page for popup prevention and monitoring")
     
     # Patch sync Browser.new_context
     if SyncBrowser:
@@ -1158,14 +1515,14 @@ def _intercept_playwright():
             # Force no_viewport=True to allow window processing to handle resize naturally
             if "no_viewport" not in kwargs and "viewport" not in kwargs:
                 kwargs["no_viewport"] = True
-                logger.debug("Forcing no_viewport=True for natural window resizing")
+                _get_logger().debug("Forcing no_viewport=True for natural window resizing")
             
             context = _orig_sync_browser_new_context(self, *args, **kwargs)
             _install_popup_prevention_on_context(context)
             return context
         
         SyncBrowser.new_context = _patched_sync_browser_new_context
-        logger.debug("Patched sync Browser.new_context for popup prevention and resizing")
+        _get_logger().debug("Patched sync Browser.new_context for popup prevention and resizing")
         
         # Patch sync Browser.new_page (creates implicit context + page)
         _orig_sync_browser_new_page = SyncBrowser.new_page
@@ -1174,7 +1531,7 @@ def _intercept_playwright():
             # Force no_viewport=True to allow window processing to handle resize naturally
             if "no_viewport" not in kwargs and "viewport" not in kwargs:
                 kwargs["no_viewport"] = True
-                logger.debug("Forcing no_viewport=True for natural window resizing")
+                _get_logger().debug("Forcing no_viewport=True for natural window resizing")
 
             page = _orig_sync_browser_new_page(self, *args, **kwargs)
             # Install on page and also on its context for future pages
@@ -1184,23 +1541,20 @@ def _intercept_playwright():
             
             # Monitor page close
             try:
-                from miniagent_ws import get_support_manager
-                manager = get_support_manager()
-                if manager:
-                    manager.monitor_page_close(page)
+                manager.monitor_page_close(page)
             except Exception:
                 pass
 
             return page
         
         SyncBrowser.new_page = _patched_sync_browser_new_page
-        logger.debug("Patched sync Browser.new_page for popup prevention, resizing and monitoring")
+        _get_logger().debug("Patched sync Browser.new_page for popup prevention, resizing and monitoring")
     
     # Import async Browser and BrowserContext classes
     try:
         from playwright.async_api import Browser as AsyncBrowser, BrowserContext as AsyncBrowserContext
     except ImportError:
-        logger.debug("Could not import async Browser/BrowserContext for popup prevention")
+        _get_logger().debug("Could not import async Browser/BrowserContext for popup prevention")
         AsyncBrowser = None
         AsyncBrowserContext = None
     
@@ -1214,17 +1568,14 @@ def _intercept_playwright():
             
             # Monitor page close
             try:
-                from miniagent_ws import get_support_manager
-                manager = get_support_manager()
-                if manager:
-                    manager.monitor_page_close(page)
+                manager.monitor_page_close(page)
             except Exception:
                 pass
                 
             return page
         
         AsyncBrowserContext.new_page = _patched_async_context_new_page
-        logger.debug("Patched async BrowserContext.new_page for popup prevention and monitoring")
+        _get_logger().debug("Patched async BrowserContext.new_page for popup prevention and monitoring")
     
     # Patch async Browser.new_context
     if AsyncBrowser:
@@ -1234,14 +1585,14 @@ def _intercept_playwright():
             # Force no_viewport=True to allow window processing to handle resize naturally
             if "no_viewport" not in kwargs and "viewport" not in kwargs:
                 kwargs["no_viewport"] = True
-                logger.debug("Forcing no_viewport=True for natural window resizing")
+                _get_logger().debug("Forcing no_viewport=True for natural window resizing")
             
             context = await _orig_async_browser_new_context(self, *args, **kwargs)
             _install_popup_prevention_on_context_async(context)
             return context
         
         AsyncBrowser.new_context = _patched_async_browser_new_context
-        logger.debug("Patched async Browser.new_context for popup prevention and resizing")
+        _get_logger().debug("Patched async Browser.new_context for popup prevention and resizing")
         
         # Patch async Browser.new_page (creates implicit context + page)
         _orig_async_browser_new_page = AsyncBrowser.new_page
@@ -1250,7 +1601,7 @@ def _intercept_playwright():
             # Force no_viewport=True to allow window processing to handle resize naturally
             if "no_viewport" not in kwargs and "viewport" not in kwargs:
                 kwargs["no_viewport"] = True
-                logger.debug("Forcing no_viewport=True for natural window resizing")
+                _get_logger().debug("Forcing no_viewport=True for natural window resizing")
 
             page = await _orig_async_browser_new_page(self, *args, **kwargs)
             # Install on page and also on its context for future pages
@@ -1260,22 +1611,18 @@ def _intercept_playwright():
             
             # Monitor page close
             try:
-                from miniagent_ws import get_support_manager
-                manager = get_support_manager()
-                if manager:
-                    manager.monitor_page_close(page)
+                manager.monitor_page_close(page)
             except Exception:
                 pass
 
             return page
         
         AsyncBrowser.new_page = _patched_async_browser_new_page
-        logger.debug("Patched async Browser.new_page for popup prevention, resizing and monitoring")
+        _get_logger().debug("Patched async Browser.new_page for popup prevention, resizing and monitoring")
     
     # === Error interception ===
     
     # Track last active page to provide context for global errors
-    import weakref
     global _last_active_page_ref
     _last_active_page_ref = None
     
@@ -1283,47 +1630,44 @@ def _intercept_playwright():
     global _last_failure_selectors
     _last_failure_selectors = (None, None)
     
-    def _get_support_context(page_obj=None) -> Dict[str, Any]:
-        """
-        Get context for support request (browser, page info, CDP target, etc.).
-        Uses provided page_obj or falls back to last active page.
-        """
-        global _last_active_page_ref
-        
-        # Resolve page object
-        if not page_obj and _last_active_page_ref:
-            try:
-                page_obj = _last_active_page_ref()
-            except:
-                pass
-        
-        # Extract page info
-        page_info = _get_page_info(page_obj) if page_obj else {}
-        
-        # Get browser info
-        browser_info = {"browser": "chromium", "debug_port": None}
+    def _resolve_browser_info(page_obj) -> _BrowserInfo:
+        """Look up the launch-time browser info (name, debug port, PID) for a page."""
+        browser_info = _DEFAULT_BROWSER_INFO
         try:
             if page_obj and hasattr(page_obj, "context"):
                 ctx = page_obj.context
-                # Try via Browser → mapping
-                if hasattr(ctx, "browser") and ctx.browser and id(ctx.browser) in _browser_info:
-                    browser_info = _browser_info[id(ctx.browser)]
-                # Persistent context path stores mapping by context id
-                elif id(ctx) in _browser_info:
-                    browser_info = _browser_info[id(ctx)]
+                try:
+                    cached = _context_browser_info.get(ctx)
+                except TypeError:
+                    cached = None
+                if cached is not None:
+                    return cached
+                
+                # Try via Browser → mapping, then the persistent context path (keyed by context)
+                found = None
+                if hasattr(ctx, "browser") and ctx.browser:
+                    found = _lookup_browser_info(ctx.browser)
+                if found is None:
+                    found = _lookup_browser_info(ctx)
+                if found is None:
+                    return browser_info
+                browser_info = found
+                try:
+                    _context_browser_info[ctx] = browser_info
+                except TypeError:
+                    pass
             # Fallback: detect browser type off the object if needed
             elif page_obj and hasattr(page_obj, "_impl") and hasattr(page_obj._impl, "_browser_type"):
                 bt_name = page_obj._impl._browser_type.name
-                browser_info["browser"] = bt_name if bt_name in ("firefox", "webkit") else "chromium"
-                browser_info["pid"] = None # Can't easily determine pid in fallback
+                # Can't easily determine debug port or pid in fallback
+                browser_info = _BrowserInfo(bt_name if bt_name in _KNOWN_BROWSERS else "chromium")
         except Exception:
             pass
-        
-        # Try to resolve CDP Target ID for Chromium browsers
-        cdp_target_id = None
-        if browser_info.get("debug_port") and page_info.get("url"):
-            cdp_target_id = _get_cdp_target_id(browser_info["debug_port"], page_info["url"])
-        
+        return browser_info
+    
+    def _build_support_context(browser_info: _BrowserInfo, page_info: Dict[str, Any],
+                               cdp_target_id: Optional[str]) -> Dict[str, Any]:
+        """Assemble the support request context shared by the sync and async paths."""
         # Build resume endpoint info if HTTP resume is enabled
         resume_endpoint = None
         if _RESUME_HTTP_ENABLED and _RESUME_HTTP_TOKEN:
@@ -1336,9 +1680,9 @@ def _intercept_playwright():
             }
             
         return {
-            "browser": browser_info["browser"],
-            "pid": browser_info.get("pid"),
-            "debug_port": browser_info.get("debug_port"),
+            "browser": browser_info.browser,
+            "pid": browser_info.pid,
+            "debug_port": browser_info.debug_port,
             "url": page_info.get("url"),
             "title": page_info.get("title"),
             "page_id": page_info.get("page_id"),
@@ -1346,191 +1690,276 @@ def _intercept_playwright():
             "cdp_target_id": cdp_target_id
         }
     
-    def _wrap_method(cls, method_name: str, is_async: bool = False):
-        """Wrap a method to catch and report Playwright exceptions."""
-        orig_method = getattr(cls, method_name)
+    def _get_support_context(page_obj=None) -> Dict[str, Any]:
+        """
+        Get context for support request (browser, page info, CDP target, etc.).
+        Uses provided page_obj or falls back to last active page.
+        """
+        global _last_active_page_ref
         
-        def _resolve_page_obj(obj):
-            """Resolve Page object from Page or Locator instances."""
+        # Resolve page object
+        if not page_obj and _last_active_page_ref:
             try:
-                # If it's already a Page (sync or async), we're done
-                if isinstance(obj, (SyncPage, AsyncPage)):
-                    return obj
-                # Common Locator links
-                if hasattr(obj, "page"):
-                    return obj.page
-                if hasattr(obj, "_page"):
-                    return obj._page
-                # Fallback via frame → page
-                if hasattr(obj, "_frame") and hasattr(obj._frame, "page"):
-                    return obj._frame.page
+                page_obj = _last_active_page_ref()
+            except Exception:
+                pass
+        
+        # Extract page info
+        page_info = _get_page_info(page_obj) if page_obj else {}
+        
+        # Get browser info
+        browser_info = _resolve_browser_info(page_obj)
+        
+        # Try to resolve CDP Target ID for Chromium browsers (cached per page)
+        cdp_target_id = None
+        if browser_info.debug_port and page_info.get("url"):
+            cdp_target_id = _get_page_target_id(page_obj, browser_info.debug_port, page_info["url"])
+        
+        return _build_support_context(browser_info, page_info, cdp_target_id)
+    
+    async def _get_support_context_async(page_obj=None) -> Dict[str, Any]:
+        """
+        Async variant of _get_support_context for async Playwright pages.
+        Awaits the page title and runs the CDP target lookup concurrently.
+        """
+        global _last_active_page_ref
+        
+        # Resolve page object
+        if not page_obj and _last_active_page_ref:
+            try:
+                page_obj = _last_active_page_ref()
             except Exception:
                 pass
+        
+        browser_info = _resolve_browser_info(page_obj)
+        page_info = {}
+        cdp_target_id = None
+        
+        if page_obj:
+            url = getattr(page_obj, "url", None)
+            page_info = {"url": url, "title": None, "page_id": str(id(page_obj))}
+            
+            # title() is a browser round-trip and the CDP lookup is blocking HTTP;
+            # overlap them instead of paying for both back to back
+            cdp_target_id = _cached_page_target_id(page_obj)
+            need_target = cdp_target_id is None and browser_info.debug_port and url
+            if _CAPTURE_TITLE:
+                page_info["title"] = _cached_page_title(page_obj, url)
+            need_title = _CAPTURE_TITLE and page_info["title"] is None
+            lookups = []
+            if need_title:
+                lookups.append(page_obj.title())
+            if need_target:
+                # run_in_executor rather than asyncio.to_thread, which needs Python 3.9
+                lookups.append(asyncio.get_running_loop().run_in_executor(
+                    None, _get_page_target_id, page_obj, browser_info.debug_port, url))
+            results = iter(await asyncio.gather(*lookups, return_exceptions=True))
+            
+            if need_title:
+                title = next(results)
+                if not isinstance(title, BaseException):
+                    page_info["title"] = title
+                    _remember_page_title(page_obj, url, title)
+            if need_target:
+                target_id = next(results)
+                if not isinstance(target_id, BaseException):
+                    cdp_target_id = target_id
+        
+        return _build_support_context(browser_info, page_info, cdp_target_id)
+    
+    # Errors the wrappers inspect; built once instead of per call
+    _reported_errors = (PlaywrightTimeoutError, PlaywrightError, AssertionError, NeedsAgentInterventionError)
+    _page_types = (SyncPage, AsyncPage)
+    
+    def _pick_page_resolver(obj) -> Callable[[Any], Any]:
+        """Choose how to get from an instance of type(obj) to its Page (probed once per type)."""
+        # If it's already a Page (sync or async), we're done
+        if isinstance(obj, _page_types):
+            return _identity
+        # Common Locator links
+        if hasattr(obj, "page"):
+            return attrgetter("page")
+        if hasattr(obj, "_page"):
+            return attrgetter("_page")
+        # Fallback via frame → page
+        if hasattr(obj, "_frame") and hasattr(obj._frame, "page"):
+            return attrgetter("_frame.page")
+        return _return_none
+    
+    # type -> resolver; every wrapped call is a single dict lookup after the first call per type
+    _page_resolvers: Dict[type, Callable[[Any], Any]] = {SyncPage: _identity, AsyncPage: _identity}
+    
+    def _resolve_page_obj(obj):
+        """Resolve Page object from Page or Locator instances."""
+        try:
+            resolver = _page_resolvers.get(type(obj))
+            if resolver is None:
+                resolver = _page_resolvers[type(obj)] = _pick_page_resolver(obj)
+            return resolver(obj)
+        except Exception:
             return None
+    
+    def _remember_active_page(page_obj):
+        """Point _last_active_page_ref at page_obj, reusing the ref if it already does."""
+        global _last_active_page_ref
+        try:
+            if _last_active_page_ref is None or _last_active_page_ref() is not page_obj:
+                _last_active_page_ref = weakref.ref(page_obj)
+        except Exception:
+            pass
+    
+    def _describe_error(method_name: str, obj, args, kwargs, e):
+        """
+        Build the report fields for a caught error.
+        Returns (error_type, error_msg, details, success_selector, failure_selector).
+        """
+        error_type = type(e).__name__
+        error_msg = str(e)[:200]
+        
+        # Extract detection selectors
+        success_selector, failure_selector = _extract_detection_selectors(method_name, obj, args, kwargs)
+        
+        # Store selectors for global error handling (in case user catches this and raises NeedsAgentInterventionError)
+        if success_selector or failure_selector:
+            global _last_failure_selectors
+            _last_failure_selectors = (success_selector, failure_selector)
+        
+        # Build details string including selectors for human readability
+        details = f"{method_name}: {error_msg}"
+        if success_selector:
+            details += f" | successSelector={success_selector}"
+        if failure_selector:
+            details += f" | failureSelector={failure_selector}"
+        
+        return error_type, error_msg, details, success_selector, failure_selector
+    
+    def _send_error_report(e, error_type: str, details: str, ctx: Dict[str, Any],
+                           success_selector: Optional[str], failure_selector: Optional[str]):
+        """Trigger the support request for a NeedsAgentInterventionError and mark it handled."""
+        manager.trigger_support_request(
+            reason=error_type,
+            details=details,
+            browser=ctx["browser"],
+            debug_port=ctx["debug_port"],
+            url=ctx["url"],
+            title=ctx["title"],
+            page_id=ctx["page_id"],
+            resume_endpoint=ctx["resume_endpoint"],
+            success_selector=success_selector,
+            failure_selector=failure_selector,
+            cdp_target_id=ctx["cdp_target_id"]
+        )
+        # Mark as handled so global hook doesn't re-trigger
+        e._miniagent_handled = True
+    
+    def _handle_sync_error(obj, method_name: str, args, kwargs, e) -> bool:
+        """
+        Report an error caught by a sync wrapper and apply the hold/swallow mode.
+        Returns True if the error was handled (wrapper returns None), False to re-raise.
+        """
+        error_type, error_msg, details, success_selector, failure_selector = \
+            _describe_error(method_name, obj, args, kwargs, e)
+        
+        # For other errors (not NeedsAgentInterventionError), always re-raise
+        if not isinstance(e, NeedsAgentInterventionError):
+            return False
+        
+        # Resolve page object again (in case it wasn't resolved before)
+        page_obj = _resolve_page_obj(obj)
+        
+        # Context (title, CDP target) is only needed when a request is actually sent
+        ctx = _get_support_context(page_obj)
+        _send_error_report(e, error_type, details, ctx, success_selector, failure_selector)
+        
+        # Handle based on mode (only for NeedsAgentInterventionError)
+        if _MODE == "hold":
+            _park_until_resume(error_type, error_msg, page_obj)
+        # In every mode, DON'T re-raise - return None to continue (keeps browser open)
+        return True
+    
+    async def _hold_async(error_type: str):
+        """Async park until resume/timeout without blocking the event loop."""
+        _get_logger().warning(f"Holding on error ({error_type}) - waiting for agent. Resume file: {_RESUME_FILE}")
+        deadline = _hold_deadline()
+        resume_event = _loop_resume_event()
+        while True:
+            # Clear before checking so a resume landing in between still wakes the wait below
+            resume_event.clear()
+            try:
+                if _consume_resume_signal():
+                    _get_logger().info("Resume signal detected; continuing.")
+                    return
+            except Exception:
+                pass
+            if deadline and time.time() >= deadline:
+                _get_logger().info("Hold timeout reached; continuing.")
+                return
+                
+            # Check if page is closed - handled by event listener now
+            # But we keep a check just in case the event listener failed or wasn't attached
+            # However, user requested to make it like "when no hold is there"
+            # The event listener in SupportRequestManager calls cancel_support_request
+            # which sets active_request_id to None, helping us exit the loop.
+            
+            # One shared event per loop wakes every held coroutine on an HTTP resume;
+            # the timeout still covers file-based resume and the hold deadline
+            try:
+                await asyncio.wait_for(resume_event.wait(), timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def _handle_async_error(obj, method_name: str, args, kwargs, e) -> bool:
+        """Async counterpart of _handle_sync_error."""
+        error_type, error_msg, details, success_selector, failure_selector = \
+            _describe_error(method_name, obj, args, kwargs, e)
+        
+        if not isinstance(e, NeedsAgentInterventionError):
+            return False
+        
+        # Resolve page object again
+        page_obj = _resolve_page_obj(obj)
         
+        # Get context using helper (awaits title/CDP lookups concurrently)
+        ctx = await _get_support_context_async(page_obj)
+        _send_error_report(e, error_type, details, ctx, success_selector, failure_selector)
+        
+        if _MODE == "hold":
+            await _hold_async(error_type)
+        return True
+    
+    def _wrap_method(cls, method_name: str, orig_method, is_async: bool = False):
+        """Wrap a method to catch and report Playwright exceptions."""
+        
+        # The wrappers stay small: the success path is page tracking plus the call,
+        # and all reporting lives in the shared _handle_*_error helpers
         def _sync_wrapper(self, *args, **kwargs):
+            if not _INTERCEPT_ACTIVE:
+                return orig_method(self, *args, **kwargs)
             try:
-                # Resolve page object from Page or Locator
+                # Resolve page object from Page or Locator and update last active page
                 page_obj = _resolve_page_obj(self)
-                
-                # Update last active page
                 if page_obj:
-                    global _last_active_page_ref
-                    try:
-                        _last_active_page_ref = weakref.ref(page_obj)
-                    except:
-                        pass
+                    _remember_active_page(page_obj)
                 
                 return orig_method(self, *args, **kwargs)
-            except (PlaywrightTimeoutError, PlaywrightError, AssertionError, NeedsAgentInterventionError) as e:
-                # Resolve page object again (in case it wasn't resolved before)
-                page_obj = _resolve_page_obj(self)
-                
-                # Get context using helper
-                ctx = _get_support_context(page_obj)
-                
-                # Determine error type
-                error_type = type(e).__name__
-                error_msg = str(e)[:200]
-                
-                # Extract detection selectors
-                success_selector, failure_selector = _extract_detection_selectors(method_name, self, args, kwargs)
-                
-                # Store selectors for global error handling (in case user catches this and raises NeedsAgentInterventionError)
-                if success_selector or failure_selector:
-                    global _last_failure_selectors
-                    _last_failure_selectors = (success_selector, failure_selector)
-                
-                # Build details string including selectors for human readability
-                details = f"{method_name}: {error_msg}"
-                if success_selector:
-                    details += f" | successSelector={success_selector}"
-                if failure_selector:
-                    details += f" | failureSelector={failure_selector}"
-                
-                # Trigger support request
-                if isinstance(e, NeedsAgentInterventionError):
-                    manager.trigger_support_request(
-                        reason=error_type,
-                        details=details,
-                        browser=ctx["browser"],
-                        debug_port=ctx["debug_port"],
-                        url=ctx["url"],
-                        title=ctx["title"],
-                        page_id=ctx["page_id"],
-                        resume_endpoint=ctx["resume_endpoint"],
-                        success_selector=success_selector,
-                        failure_selector=failure_selector,
-                        cdp_target_id=ctx["cdp_target_id"]
-                    )
-                    # Mark as handled so global hook doesn't re-trigger
-                    e._miniagent_handled = True
-                    
-                    # Handle based on mode (only for NeedsAgentInterventionError)
-                    if _MODE == "hold":
-                        _park_until_resume(error_type, error_msg, page_obj)
-                        # DON'T re-raise - return None to continue (keeps browser open)
-                        return None
-                    if _MODE == "swallow":
-                        # DON'T re-raise - return None to continue
-                        return None
-                    # For report mode: DON'T re-raise, just return None
+            except _reported_errors as e:
+                if _handle_sync_error(self, method_name, args, kwargs, e):
                     return None
-                
-                # For other errors (not NeedsAgentInterventionError), always re-raise
                 raise
         
         async def _async_wrapper(self, *args, **kwargs):
+            if not _INTERCEPT_ACTIVE:
+                return await orig_method(self, *args, **kwargs)
             try:
-                # Resolve page object from Page or Locator
+                # Resolve page object from Page or Locator and update last active page
                 page_obj = _resolve_page_obj(self)
-                
-                # Update last active page
                 if page_obj:
-                    global _last_active_page_ref
-                    try:
-                        _last_active_page_ref = weakref.ref(page_obj)
-                    except:
-                        pass
-
-                return await orig_method(self, *args, **kwargs)
-            except (PlaywrightTimeoutError, PlaywrightError, AssertionError, NeedsAgentInterventionError) as e:
-                # Resolve page object again
-                page_obj = _resolve_page_obj(self)
-                
-                # Get context using helper
-                ctx = _get_support_context(page_obj)
-                
-                error_type = type(e).__name__
-                error_msg = str(e)[:200]
-                
-                # Extract detection selectors
-                success_selector, failure_selector = _extract_detection_selectors(method_name, self, args, kwargs)
+                    _remember_active_page(page_obj)
                 
-                # Store selectors for global error handling (in case user catches this and raises NeedsAgentInterventionError)
-                if success_selector or failure_selector:
-                    global _last_failure_selectors
-                    _last_failure_selectors = (success_selector, failure_selector)
-                
-                # Build details string including selectors for human readability
-                details = f"{method_name}: {error_msg}"
-                if success_selector:
-                    details += f" | successSelector={success_selector}"
-                if failure_selector:
-                    details += f" | failureSelector={failure_selector}"
-                
-                if isinstance(e, NeedsAgentInterventionError):
-                    manager.trigger_support_request(
-                        reason=error_type,
-                        details=details,
-                        browser=ctx["browser"],
-                        debug_port=ctx["debug_port"],
-                        url=ctx["url"],
-                        title=ctx["title"],
-                        page_id=ctx["page_id"],
-                        resume_endpoint=ctx["resume_endpoint"],
-                        success_selector=success_selector,
-                        failure_selector=failure_selector,
-                        cdp_target_id=ctx["cdp_target_id"]
-                    )
-                    # Mark as handled so global hook doesn't re-trigger
-                    e._miniagent_handled = True
-                    
-                    # Handle based on mode (only for NeedsAgentInterventionError)
-                    if _MODE == "hold":
-                        # Async park until resume/timeout
-                        logger.warning(f"Holding on error ({error_type}) - waiting for agent. Resume file: {_RESUME_FILE}")
-                        deadline = _hold_deadline()
-                        while True:
-                            try:
-                                if _RESUME_FILE and Path(_RESUME_FILE).exists():
-                                    logger.info("Resume signal detected; continuing.")
-                                    try:
-                                        Path(_RESUME_FILE).unlink(missing_ok=True)
-                                    except Exception:
-                                        pass
-                                    return None
-                            except Exception:
-                                pass
-                            if deadline and time.time() >= deadline:
-                                logger.info("Hold timeout reached; continuing.")
-                                return None
-                                
-                            # Check if page is closed - handled by event listener now
-                            # But we keep a check just in case the event listener failed or wasn't attached
-                            # However, user requested to make it like "when no hold is there"
-                            # The event listener in SupportRequestManager calls cancel_support_request
-                            # which sets active_request_id to None, helping us exit the loop.
-                            pass
-                                    
-                            await asyncio.sleep(1.0)
-                    
-                    if _MODE == "swallow":
-                        return None
-                    # For report mode: DON'T re-raise, just return None
+                return await orig_method(self, *args, **kwargs)
+            except _reported_errors as e:
+                if await _handle_async_error(self, method_name, args, kwargs, e):
                     return None
-                
-                # For other errors (not NeedsAgentInterventionError), always re-raise
                 raise
         
         wrapper = _async_wrapper if is_async else _sync_wrapper
@@ -1539,38 +1968,25 @@ def _intercept_playwright():
         
         setattr(cls, method_name, wrapper)
     
-    # Wrap common Page methods (sync)
-    page_methods = ["goto", "click", "fill", "press", "type", "select_option", "check", 
-                    "uncheck", "wait_for_selector", "wait_for_load_state", "wait_for_url",
-                    "wait_for_timeout", "screenshot", "pdf"]
-    
-    for method in page_methods:
-        if hasattr(SyncPage, method):
-            _wrap_method(SyncPage, method, is_async=False)
-    
-    # Wrap common Page methods (async)
-    for method in page_methods:
-        if hasattr(AsyncPage, method):
-            _wrap_method(AsyncPage, method, is_async=True)
-    
-    # Wrap Locator methods (sync)
+    # (class, method names, is_async) for every wrapped Playwright API
+    wrap_targets = [
+        (SyncPage, _PAGE_METHODS, False),
+        (AsyncPage, _PAGE_METHODS, True),
+    ]
     try:
         from playwright.sync_api import Locator as SyncLocator
         from playwright.async_api import Locator as AsyncLocator
-        
-        locator_methods = ["click", "fill", "press", "type", "select_option", "check",
-                          "uncheck", "wait_for", "screenshot"]
-        
-        for method in locator_methods:
-            if hasattr(SyncLocator, method):
-                _wrap_method(SyncLocator, method, is_async=False)
-        
-        for method in locator_methods:
-            if hasattr(AsyncLocator, method):
-                _wrap_method(AsyncLocator, method, is_async=True)
+        wrap_targets.append((SyncLocator, _LOCATOR_METHODS, False))
+        wrap_targets.append((AsyncLocator, _LOCATOR_METHODS, True))
     except ImportError:
         pass
     
+    for cls, methods, is_async in wrap_targets:
+        for method in methods:
+            orig_method = getattr(cls, method, None)
+            if orig_method is not None:
+                _wrap_method(cls, method, orig_method, is_async=is_async)
+    
     # Wrap expect assertions
     try:
         from playwright.sync_api import expect as sync_expect
@@ -1580,20 +1996,83 @@ def _intercept_playwright():
         pass
     
     _patched = True
-    logger.info("Playwright interception activated")
+    _get_logger().info("Playwright interception activated")
+
+
+# Importing either public API module is what makes a process a Playwright script
+_PLAYWRIGHT_ENTRY_MODULES = frozenset({"playwright.sync_api", "playwright.async_api"})
+
 
+def _activate_interception():
+    try:
+        _intercept_playwright()
+    except Exception as e:
+        _get_logger().error(f"Failed to intercept Playwright: {e}", exc_info=True)
+    
+    # Start HTTP resume server (if enabled); only Playwright scripts can be held and resumed
+    try:
+        _start_resume_http_server()
+    except Exception as e:
+        _get_logger().error(f"Failed to start resume HTTP server: {e}")
 
-# Activate interception on module import
-try:
-    _intercept_playwright()
-except Exception as e:
-    logger.error(f"Failed to intercept Playwright: {e}", exc_info=True)
 
-# Start HTTP resume server (if enabled)
-try:
-    _start_resume_http_server()
-except Exception as e:
-    logger.error(f"Failed to start resume HTTP server: {e}")
+class _PlaywrightImportHook:
+    """sys.meta_path finder that patches Playwright right after its API is first imported.
+    
+    Keeps unrelated interpreters (pip, python -c, test collection, ...) from paying for a
+    Playwright import just because this directory is on PYTHONPATH.
+    """
+    
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname not in _PLAYWRIGHT_ENTRY_MODULES:
+            return None
+        
+        # Let the regular finders locate the module, then hook its loader
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        
+        loader = spec.loader
+        if loader is None or not hasattr(loader, "exec_module"):
+            return spec
+        orig_exec_module = loader.exec_module
+        
+        def exec_module(module):
+            orig_exec_module(module)
+            # Unhook before patching: _intercept_playwright imports both API modules itself
+            self.uninstall()
+            _activate_interception()
+        
+        loader.exec_module = exec_module
+        return spec
+    
+    def uninstall(self):
+        try:
+            sys.meta_path.remove(self)
+        except ValueError:
+            pass
+
+
+if _MINIAGENT_ENABLED:
+    _playwright_loaded = bool(_PLAYWRIGHT_ENTRY_MODULES.intersection(sys.modules))
+    _playwright_available = _playwright_loaded or importlib.util.find_spec("playwright") is not None
+    
+    # Signal handlers don't need Playwright, so install them now, on the main thread and
+    # before user code, rather than at the (possibly off-main-thread) Playwright import.
+    # Without a token there is never a support request to cancel.
+    if _playwright_available and os.environ.get("MINIAGENT_TOKEN"):
+        _register_signal_handlers()
+    
+    # Patch now if Playwright is already loaded, otherwise defer to its first import
+    if _playwright_loaded:
+        _activate_interception()
+    elif _playwright_available:
+        sys.meta_path.insert(0, _PlaywrightImportHook())
 
 def _handle_exception(exc_type, exc_value, exc_traceback):
     """Global exception hook to catch NeedsAgentInterventionError."""
@@ -1631,7 +2110,7 @@ def _handle_exception(exc_type, exc_value, exc_traceback):
                     if _last_active_page_ref:
                         try:
                             page_obj = _last_active_page_ref()
-                        except:
+                        except Exception:
                             pass
                             
                     _park_until_resume(exc_type.__name__, str(exc_value), page_obj)
@@ -1642,10 +2121,11 @@ def _handle_exception(exc_type, exc_value, exc_traceback):
                     return
         except Exception as e:
             # Don't let our hook crash the app
-            logger.error(f"Exception in global hook: {e}")
+            _get_logger().error(f"Exception in global hook: {e}")
             pass
     
     # For all other cases, call the original excepthook (prints traceback and exits)
     sys.__excepthook__(exc_type, exc_value, exc_traceback)
 
-sys.excepthook = _handle_exception
+if _MINIAGENT_ENABLED:
+    sys.excepthook = _handle_exception